@@ -0,0 +1,116 @@
+# analysis/reference_matcher.py
+from collections import deque
+
+
+class ReferenceMatcher:
+    """
+    Aho-Corasick automaton over every resource identifier collected in a run
+    (DB endpoints, DynamoDB table names, SQS queue names, SNS topic ARNs, S3
+    bucket names). Each Lambda environment-variable value is scanned ONCE and
+    every referenced resource comes back, instead of testing each identifier
+    as a substring of each value (functions x variables x resources).
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._built = False
+
+    def add(self, pattern, ref):
+        """Registers `ref` to be reported whenever `pattern` occurs in a text."""
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if ref not in self._out[state]:
+            self._out[state].append(ref)
+        self._built = False
+
+    def build(self):
+        """Computes failure links breadth-first and folds each state's suffix
+        matches into its output list, so find() never walks the fail chain for
+        output."""
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                for ref in self._out[self._fail[nxt]]:
+                    if ref not in self._out[nxt]:
+                        self._out[nxt].append(ref)
+        self._built = True
+        return self
+
+    def find(self, text):
+        """Returns every registered ref whose pattern occurs in `text`, in order
+        of first occurrence and without duplicates."""
+        if not self._built:
+            self.build()
+        goto, fail, out = self._goto, self._fail, self._out
+        found, seen = [], set()
+        state = 0
+        for char in str(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for ref in out[state]:
+                if ref not in seen:
+                    seen.add(ref)
+                    found.append(ref)
+        return found
+
+
+def build_reference_matcher(all_resources):
+    """
+    Builds the run-wide matcher. Refs are (kind, name) tuples where `kind` is
+    also the Mermaid node prefix for that resource type.
+    """
+    matcher = ReferenceMatcher()
+    for rds in all_resources.get('rds', {}).get('instances', []):
+        if not rds.get('Endpoint', 'N/A').startswith('N/A'):
+            matcher.add(rds['Endpoint'], ('rds', rds['Name']))
+    for cluster in all_resources.get('neptune', {}).get('clusters', []):
+        if cluster.get('Endpoint', 'N/A') != 'N/A':
+            matcher.add(cluster['Endpoint'], ('neptune', cluster['Name']))
+    for cache in all_resources.get('elasticache', {}).get('clusters', []):
+        if cache.get('Endpoint', 'N/A') != 'N/A':
+            matcher.add(cache['Endpoint'], ('elasticache', cache['Name']))
+    for table in all_resources.get('dynamodb', {}).get('tables', []):
+        matcher.add(table['Name'], ('dynamo', table['Name']))
+    for queue in all_resources.get('queues', {}).get('sqs_queues', []):
+        matcher.add(queue['Name'], ('sqs', queue['Name']))
+    for topic in all_resources.get('sns', {}).get('topics', []):
+        matcher.add(topic['TopicArn'], ('sns', topic['Name']))
+    for bucket in all_resources.get('s3', {}).get('buckets', []):
+        matcher.add(bucket['Name'], ('s3', bucket['Name']))
+    return matcher.build()
+
+
+def find_lambda_references(functions, matcher):
+    """
+    Scans every Lambda environment variable once and returns one entry per
+    (function, referenced resource, variable):
+    {'function': name, 'kind': 'rds', 'name': 'orders-db', 'variable': 'DB_HOST'}
+    """
+    references = []
+    for func in functions:
+        for key, value in func.get('EnvironmentVariables', {}).items():
+            for kind, name in matcher.find(value):
+                references.append({'function': func['Name'], 'kind': kind, 'name': name, 'variable': key})
+    return references
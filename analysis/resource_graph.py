@@ -0,0 +1,322 @@
+# analysis/resource_graph.py
+
+# Edge types. Every cross-reference the reports draw is one of these.
+USES_SG = 'uses_sg'
+IN_SUBNET = 'in_subnet'
+TRIGGERS = 'triggers'
+TARGETS = 'targets'
+ROUTES_TO = 'routes_to'
+CONNECTS_TO_DB = 'connects_to_db'
+REFERENCES = 'references'
+ALLOWS_FROM = 'allows_from'
+
+# Node types double as Mermaid node-ID prefixes.
+DB_NODE_TYPES = ('rds', 'neptune', 'elasticache', 'dynamo')
+
+NODE_TYPE_LABELS = {
+    'ec2': 'EC2', 'rds': 'RDS', 'lambda': 'Lambda', 'lb': 'Load Balancer',
+    'neptune': 'Neptune', 'elasticache': 'ElastiCache', 'ecs': 'ECS',
+    'api': 'API Gateway', 'sqs': 'SQS', 'kinesis': 'Kinesis', 'firehose': 'Firehose',
+    'dynamo': 'DynamoDB', 'sns': 'SNS', 's3': 'S3', 'sg': 'Security Group',
+    'subnet': 'Subnet', 'vpc': 'VPC', 'nat': 'NAT Gateway', 'vpce': 'VPC Endpoint',
+    'ecs_task': 'ECS Task', 'rds_eni': 'RDS/Neptune ENI', 'eni': 'ENI',
+    'rule': 'EventBridge Rule',
+}
+
+# ENI owner types whose ENIs don't name the owning resource; they're only
+# added as their own node when no collected resource of these types already
+# holds the ENI's security groups.
+_SHARED_ENI_OWNERS = {'lambda': ('lambda',), 'rds_eni': ('rds', 'neptune')}
+
+
+class ResourceGraph:
+    """
+    In-memory graph of every collected resource, built once per run and used
+    as the single cross-reference layer by the Markdown report, the Mermaid
+    diagrams and the dry-run sheet.
+
+    Node IDs are typed (node_type, key) tuples; key is the resource name, or
+    the resource ID for security groups, subnets and VPCs. Hash indexes give
+    O(1) lookup by ARN, resource ID, name and environment, and adjacency is
+    stored per edge type in both directions so neighbour queries are
+    O(degree).
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self._by_arn = {}
+        self._by_resource_id = {}
+        self._by_name = {}
+        self._by_env = {}
+        self._out = {}
+        self._in = {}
+
+    def add_node(self, node_type, key, name=None, env=None, arn=None, resource_id=None, data=None):
+        node_id = (node_type, key)
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {'type': node_type, 'name': name or key, 'env': env, 'data': data or {}}
+            self._by_name.setdefault(name or key, []).append(node_id)
+            if env:
+                self._by_env.setdefault(env, []).append(node_id)
+        if arn:
+            self._by_arn[arn] = node_id
+        if resource_id:
+            self._by_resource_id[resource_id] = node_id
+        return node_id
+
+    def add_edge(self, src, edge_type, dst, label=None):
+        """Adds a typed edge between two known nodes. Unknown endpoints are
+        ignored, so callers can pass unresolved lookups straight through."""
+        if src is None or dst is None or src not in self.nodes or dst not in self.nodes:
+            return
+        self._out.setdefault(src, {}).setdefault(edge_type, {}).setdefault(dst, label)
+        self._in.setdefault(dst, {}).setdefault(edge_type, {}).setdefault(src, label)
+
+    def by_arn(self, arn):
+        return self._by_arn.get(arn)
+
+    def by_resource_id(self, resource_id):
+        return self._by_resource_id.get(resource_id)
+
+    def by_name(self, name, node_type=None):
+        if node_type is not None:
+            node_id = (node_type, name)
+            return node_id if node_id in self.nodes else None
+        matches = self._by_name.get(name, [])
+        return matches[0] if matches else None
+
+    def in_env(self, env):
+        return list(self._by_env.get(env, []))
+
+    def neighbors(self, node_id, edge_type):
+        return list(self._out.get(node_id, {}).get(edge_type, {}))
+
+    def predecessors(self, node_id, edge_type):
+        return list(self._in.get(node_id, {}).get(edge_type, {}))
+
+    def edges(self, node_id, edge_type):
+        """Outgoing (dst, label) pairs for one edge type."""
+        return list(self._out.get(node_id, {}).get(edge_type, {}).items())
+
+    def display_name(self, node_id):
+        return self.nodes[node_id]['name']
+
+    def typed_label(self, node_id):
+        """'Lambda: my-function' style label for a node."""
+        return f"{NODE_TYPE_LABELS.get(node_id[0], node_id[0])}: {self.display_name(node_id)}"
+
+    def name_for_id(self, resource_id):
+        """Display name for a resource ID (subnet, SG, instance), or the ID."""
+        node_id = self._by_resource_id.get(resource_id)
+        return self.nodes[node_id]['name'] if node_id else resource_id
+
+    def edge_counts(self):
+        counts = {}
+        for edges_by_type in self._out.values():
+            for edge_type, targets in edges_by_type.items():
+                counts[edge_type] = counts.get(edge_type, 0) + len(targets)
+        return counts
+
+
+def event_rule_key(bus, rule):
+    """Graph key of an EventBridge rule; rule names are only unique per bus."""
+    return f"{bus['Name']}/{rule['Name']}"
+
+
+def _lambda_name_from_arn(arn):
+    # arn:aws:lambda:region:acct:function:name[:qualifier]
+    parts = arn.split(':')
+    return parts[6] if len(parts) > 6 else parts[-1]
+
+
+def _resolve_eni_owner(graph, eni):
+    """Maps an ENI from the ec2 collector's sweep to its owner node, adding a
+    node for owners no collector reports (ECS tasks, VPC endpoints, NAT
+    gateways, ...). Returns None when the owner is already attributed."""
+    resource_type, resource_name = eni['ResourceType'], eni['ResourceName']
+    if resource_type == 'ec2' and (node_id := graph.by_resource_id(resource_name)):
+        return node_id
+    if node_id := graph.by_name(resource_name, resource_type):
+        return node_id
+    if resource_type == 'elasticache':
+        # Member nodes are named '<group>-001' or '<group>-0001-001'.
+        group = resource_name
+        for _ in range(2):
+            group = group.rsplit('-', 1)[0]
+            if node_id := graph.by_name(group, 'elasticache'):
+                return node_id
+    if owner_types := _SHARED_ENI_OWNERS.get(resource_type):
+        sg_nodes = [graph.by_resource_id(sg_id) for sg_id in eni['SecurityGroupIds']]
+        holders = [set(graph.predecessors(sg_node, USES_SG)) for sg_node in sg_nodes if sg_node]
+        if holders and any(node[0] in owner_types for node in set.intersection(*holders)):
+            return None
+    return graph.add_node(resource_type, resource_name, resource_id=eni['NetworkInterfaceId'])
+
+
+def build_resource_graph(all_resources, lambda_references):
+    """Builds the run's ResourceGraph from the collector output."""
+    graph = ResourceGraph()
+    ec2 = all_resources.get('ec2', {})
+
+    # --- Network primitives ---
+    for sg in ec2.get('security_groups', []):
+        graph.add_node('sg', sg['GroupId'], name=sg['Name'], env=sg.get('Environment'),
+                       resource_id=sg['GroupId'], data=sg)
+    for sg_id, sg_name in ec2.get('sg_map', {}).items():
+        graph.add_node('sg', sg_id, name=sg_name, resource_id=sg_id)
+    for subnet_id, subnet_name in ec2.get('subnet_map', {}).items():
+        graph.add_node('subnet', subnet_id, name=subnet_name, resource_id=subnet_id)
+    for vpc in all_resources.get('vpc', {}).get('vpcs', []):
+        graph.add_node('vpc', vpc['VpcId'], name=vpc['Name'], env=vpc.get('Environment'),
+                       resource_id=vpc['VpcId'], data=vpc)
+        for subnet in vpc.get('Subnets', []):
+            subnet_node = graph.add_node('subnet', subnet['SubnetId'], resource_id=subnet['SubnetId'])
+            graph.nodes[subnet_node]['data'] = subnet
+
+    # --- Compute, data and messaging resources ---
+    for instance in ec2.get('instances', []):
+        graph.add_node('ec2', instance['Name'], env=instance.get('Environment'),
+                       resource_id=instance['InstanceId'], data=instance)
+    for db in all_resources.get('rds', {}).get('instances', []):
+        graph.add_node('rds', db['Name'], env=db.get('Environment'), data=db)
+    for func in all_resources.get('lambda', {}).get('functions', []):
+        graph.add_node('lambda', func['Name'], env=func.get('Environment'), arn=func.get('Arn'), data=func)
+    for vpc in all_resources.get('vpc', {}).get('vpcs', []):
+        for lb in vpc.get('LoadBalancers', []):
+            graph.add_node('lb', lb['Name'], env=vpc.get('Environment'), data=lb)
+    for api in all_resources.get('apigateway', {}).get('apis', []):
+        graph.add_node('api', api['Name'], env=api.get('Environment'), resource_id=api['ApiId'], data=api)
+    for cluster in all_resources.get('container', {}).get('ecs_clusters', []):
+        for service in cluster.get('Services', []):
+            graph.add_node('ecs', service['Name'], env=cluster.get('Environment'), data=service)
+    for cluster in all_resources.get('neptune', {}).get('clusters', []):
+        graph.add_node('neptune', cluster['Name'], env=cluster.get('Environment'), data=cluster)
+    for cache in all_resources.get('elasticache', {}).get('clusters', []):
+        graph.add_node('elasticache', cache['Name'], env=cache.get('Environment'), data=cache)
+    for table in all_resources.get('dynamodb', {}).get('tables', []):
+        graph.add_node('dynamo', table['Name'], env=table.get('Environment'), data=table)
+    queues = all_resources.get('queues', {})
+    for queue in queues.get('sqs_queues', []):
+        graph.add_node('sqs', queue['Name'], env=queue.get('Environment'), arn=queue.get('Arn'), data=queue)
+    for stream in queues.get('kinesis_streams', []):
+        graph.add_node('kinesis', stream['Name'], env=stream.get('Environment'), arn=stream.get('Arn'), data=stream)
+    for stream in queues.get('firehose_streams', []):
+        graph.add_node('firehose', stream['Name'], env=stream.get('Environment'), arn=stream.get('Arn'), data=stream)
+    for topic in all_resources.get('sns', {}).get('topics', []):
+        graph.add_node('sns', topic['Name'], env=topic.get('Environment'), arn=topic['TopicArn'], data=topic)
+    for bucket in all_resources.get('s3', {}).get('buckets', []):
+        graph.add_node('s3', bucket['Name'], env=bucket.get('Environment'), data=bucket)
+    for bus in all_resources.get('eventbridge', {}).get('event_buses', []):
+        for rule in bus.get('Rules', []):
+            graph.add_node('rule', event_rule_key(bus, rule), name=rule['Name'],
+                           env=rule.get('Environment') or bus.get('Environment'), data=rule)
+
+    # --- uses_sg / in_subnet ---
+    for instance in ec2.get('instances', []):
+        node_id = ('ec2', instance['Name'])
+        for sg_id in instance.get('SecurityGroups', []):
+            graph.add_edge(node_id, USES_SG, graph.by_resource_id(sg_id))
+        graph.add_edge(node_id, IN_SUBNET, graph.by_resource_id(instance.get('SubnetId')))
+    member_fields = [
+        ('rds', all_resources.get('rds', {}).get('instances', [])),
+        ('lambda', all_resources.get('lambda', {}).get('functions', [])),
+    ]
+    for node_type, resources in member_fields:
+        for resource in resources:
+            node_id = (node_type, resource['Name'])
+            for sg_id in resource.get('SecurityGroupIds', []):
+                graph.add_edge(node_id, USES_SG, graph.by_resource_id(sg_id))
+            for subnet_id in resource.get('SubnetIds', []):
+                graph.add_edge(node_id, IN_SUBNET, graph.by_resource_id(subnet_id))
+    for cluster in all_resources.get('neptune', {}).get('clusters', []):
+        for instance in cluster.get('Instances', []):
+            for sg_id in instance.get('SecurityGroupIds', []):
+                graph.add_edge(('neptune', cluster['Name']), USES_SG, graph.by_resource_id(sg_id))
+            for subnet_id in instance.get('SubnetIds', []):
+                graph.add_edge(('neptune', cluster['Name']), IN_SUBNET, graph.by_resource_id(subnet_id))
+
+    # --- uses_sg from the ENI sweep: one bulk call that also covers ECS
+    # tasks, ElastiCache nodes, VPC endpoints and NAT gateways. The edge
+    # label is the ENI, giving SG -> ENI -> resource. ---
+    for eni in ec2.get('network_interfaces', []):
+        owner = _resolve_eni_owner(graph, eni)
+        for sg_id in eni.get('SecurityGroupIds', []):
+            graph.add_edge(owner, USES_SG, graph.by_resource_id(sg_id), label=eni['NetworkInterfaceId'])
+
+    # --- targets (load balancer -> EC2) ---
+    for vpc in all_resources.get('vpc', {}).get('vpcs', []):
+        for lb in vpc.get('LoadBalancers', []):
+            lb_node = ('lb', lb['Name'])
+            for sg_id in lb.get('SecurityGroupIds', []):
+                graph.add_edge(lb_node, USES_SG, graph.by_resource_id(sg_id))
+            for listener in lb.get('Listeners', []):
+                for tg in listener.get('TargetGroups', []):
+                    for target in tg.get('Targets', []):
+                        graph.add_edge(lb_node, TARGETS, graph.by_resource_id(target['Id']))
+
+    # --- routes_to (API -> Lambda) ---
+    for api in all_resources.get('apigateway', {}).get('apis', []):
+        for route in api.get('Routes', []):
+            if 'Lambda:' in route['Target']:
+                graph.add_edge(('api', api['Name']), ROUTES_TO, graph.by_name(route['Target'].split('`')[1], 'lambda'),
+                               label=route['RouteKey'])
+
+    # --- triggers (event source -> Lambda) ---
+    for mapping in all_resources.get('lambda', {}).get('event_source_mappings', []):
+        try:
+            function_node = graph.by_arn(mapping['FunctionArn']) or graph.by_name(_lambda_name_from_arn(mapping['FunctionArn']), 'lambda')
+            source_arn = mapping['EventSourceArn']
+            source_node = graph.by_arn(source_arn)
+            if source_node is None and ':sqs:' in source_arn:
+                source_node = graph.by_name(source_arn.split(':')[-1], 'sqs')
+            elif source_node is None and ':kinesis:' in source_arn:
+                source_node = graph.by_name(source_arn.split('/')[-1], 'kinesis')
+            graph.add_edge(source_node, TRIGGERS, function_node)
+        except (IndexError, KeyError): continue
+
+    # --- triggers (EventBridge rule -> target) ---
+    # Targets resolve through the ARN index. Qualified Lambda ARNs (aliases,
+    # versions) fall back to the function name and are indexed under the
+    # qualified ARN too, so the report can look every target up by ARN.
+    for bus in all_resources.get('eventbridge', {}).get('event_buses', []):
+        for rule in bus.get('Rules', []):
+            for target in rule.get('Targets', []):
+                target_node = graph.by_arn(target['Arn'])
+                if target_node is None and ':lambda:' in target['Arn']:
+                    target_node = graph.by_name(_lambda_name_from_arn(target['Arn']), 'lambda')
+                    if target_node:
+                        graph.add_node(*target_node, arn=target['Arn'])
+                graph.add_edge(('rule', event_rule_key(bus, rule)), TRIGGERS, target_node, label=target['Id'])
+
+    # --- connects_to_db / references (Lambda env vars) ---
+    for ref in lambda_references:
+        edge_type = CONNECTS_TO_DB if ref['kind'] in DB_NODE_TYPES else REFERENCES
+        graph.add_edge(('lambda', ref['function']), edge_type, graph.by_name(ref['name'], ref['kind']), label=ref['variable'])
+
+    # --- allows_from (dest SG -> SG its inbound rules admit) ---
+    for sg in ec2.get('security_groups', []):
+        for rule in sg.get('InboundRules', []):
+            for pair in rule.get('UserIdGroupPairs', []):
+                if source_sg_id := pair.get('GroupId'):
+                    graph.add_edge(('sg', sg['GroupId']), ALLOWS_FROM, graph.by_resource_id(source_sg_id))
+
+    return graph
+
+
+def sg_assignments(graph, sg_id):
+    """'Assigned To' strings for a security group, e.g. 'EC2: web-01'."""
+    sg_node = graph.by_resource_id(sg_id)
+    if sg_node is None:
+        return []
+    return [graph.typed_label(node_id) for node_id in sorted(graph.predecessors(sg_node, USES_SG))]
+
+
+def event_rules_by_bus(graph, env):
+    """This environment's EventBridge rules, {bus name: [rule]}. A rule's
+    environment is its own, which often differs from its bus's."""
+    by_bus = {}
+    for node_type, key in graph.in_env(env):
+        if node_type == 'rule':
+            # Rule names cannot contain '/'; partner bus names can.
+            by_bus.setdefault(key.rsplit('/', 1)[0], []).append(graph.nodes[(node_type, key)]['data'])
+    return by_bus
@@ -0,0 +1,155 @@
+# analysis/sg_connectivity.py
+import os
+import ipaddress
+
+from analysis.resource_graph import ALLOWS_FROM, IN_SUBNET, USES_SG
+
+# Above this many source x destination pairs for one security group, the
+# diagram routes the connections through a single SG hub node instead of
+# drawing every pair. Override with SG_HUB_THRESHOLD.
+SG_HUB_THRESHOLD = int(os.environ.get('SG_HUB_THRESHOLD', '24'))
+
+
+class CidrTrie:
+    """Binary prefix trie over IPv4 CIDRs.
+
+    within() returns every stored prefix that lies inside a query CIDR and
+    covering() every stored prefix that contains it, each in O(prefix length
+    + matches) instead of comparing the query against every stored CIDR.
+    """
+
+    def __init__(self):
+        self._root = {}
+
+    @staticmethod
+    def _bits(network):
+        value = int(network.network_address)
+        return [(value >> (31 - i)) & 1 for i in range(network.prefixlen)]
+
+    @staticmethod
+    def _parse(cidr):
+        try:
+            network = ipaddress.ip_network(cidr, strict=False)
+        except ValueError:
+            return None
+        return network if network.version == 4 else None
+
+    def insert(self, cidr, value):
+        network = self._parse(cidr)
+        if network is None:
+            return
+        node = self._root
+        for bit in self._bits(network):
+            node = node.setdefault(bit, {})
+        node.setdefault('values', []).append(value)
+
+    def covering(self, cidr):
+        network = self._parse(cidr)
+        if network is None:
+            return []
+        node, found = self._root, list(self._root.get('values', []))
+        for bit in self._bits(network):
+            node = node.get(bit)
+            if node is None:
+                break
+            found.extend(node.get('values', []))
+        return found
+
+    def within(self, cidr):
+        network = self._parse(cidr)
+        if network is None:
+            return []
+        node = self._root
+        for bit in self._bits(network):
+            node = node.get(bit)
+            if node is None:
+                return []
+        found, stack = [], [node]
+        while stack:
+            current = stack.pop()
+            found.extend(current.get('values', []))
+            stack.extend(child for key, child in current.items() if key != 'values')
+        return found
+
+
+def build_sg_connectivity(graph, all_resources):
+    """
+    Indexes every inbound SG rule once per run and returns, for each
+    destination security group, the set of graph nodes allowed to reach its
+    members.
+
+    UserIdGroupPairs resolve to the members of the source group. IpRanges
+    that fall inside the group's own VPC CIDR resolve, through a prefix trie
+    of that VPC's subnet CIDRs, to the members of every subnet the range
+    fully contains, or of the subnet holding it when the range is narrower
+    than a subnet (e.g. a /32 host rule). Other VPCs are never consulted, as
+    VPC CIDRs commonly overlap across an account; ranges outside the VPC
+    (e.g. 0.0.0.0/0) are internet-facing and not drawn. Also records the
+    subnet-level rules as allows_from edges on the graph.
+    """
+    vpc_tries, subnet_tries = {}, {}
+    for vpc in all_resources.get('vpc', {}).get('vpcs', []):
+        vpc_tries.setdefault(vpc['VpcId'], CidrTrie()).insert(vpc.get('CidrBlock'), vpc['VpcId'])
+        subnet_trie = subnet_tries.setdefault(vpc['VpcId'], CidrTrie())
+        for subnet in vpc.get('Subnets', []):
+            subnet_trie.insert(subnet.get('CidrBlock'), subnet['SubnetId'])
+
+    for sg in all_resources.get('ec2', {}).get('security_groups', []):
+        sg_node = graph.by_resource_id(sg['GroupId'])
+        # Snapshots stored before security groups carried their VpcId fall
+        # back to every VPC until the ec2 collector next runs.
+        vpc_ids = [sg['VpcId']] if sg.get('VpcId') else list(vpc_tries)
+        for rule in sg.get('InboundRules', []):
+            for ip_range in rule.get('IpRanges', []):
+                cidr = ip_range.get('CidrIp')
+                if not cidr:
+                    continue
+                for vpc_id in vpc_ids:
+                    if vpc_id not in vpc_tries or not vpc_tries[vpc_id].covering(cidr):
+                        continue
+                    subnet_ids = subnet_tries[vpc_id].within(cidr) or subnet_tries[vpc_id].covering(cidr)
+                    for subnet_id in subnet_ids:
+                        graph.add_edge(sg_node, ALLOWS_FROM, graph.by_resource_id(subnet_id), label=cidr)
+
+    reachable_from = {}
+    for sg in all_resources.get('ec2', {}).get('security_groups', []):
+        sg_node = graph.by_resource_id(sg['GroupId'])
+        sources = set()
+        for source_type, source_key in graph.neighbors(sg_node, ALLOWS_FROM):
+            member_edge = IN_SUBNET if source_type == 'subnet' else USES_SG
+            sources.update(graph.predecessors((source_type, source_key), member_edge))
+        if sources:
+            reachable_from[sg_node] = frozenset(sources)
+    return reachable_from
+
+
+def inferred_connections(graph, reachable_from, env_nodes, threshold=SG_HUB_THRESHOLD):
+    """
+    Expands SG reachability for one environment's nodes (graph IDs).
+
+    Returns (pairs, hubs): `pairs` is a set of (src, dest) graph IDs drawn
+    directly; `hubs` maps an SG graph ID to (sources, dests) for groups
+    whose fan-out exceeds `threshold` pairs and are drawn as
+    src -> SG -> dest instead, keeping the edge count linear.
+    """
+    env_nodes = set(env_nodes)
+    members_by_sg = {}
+    for node in env_nodes:
+        for sg_node in graph.neighbors(node, USES_SG):
+            if sg_node in reachable_from:
+                members_by_sg.setdefault(sg_node, set()).add(node)
+
+    pairs, hubs = set(), {}
+    for sg_node, dests in members_by_sg.items():
+        sources = reachable_from[sg_node] & env_nodes
+        if not sources:
+            continue
+        fan_out = len(sources) * len(dests) - len(sources & dests)
+        if fan_out > threshold:
+            hubs[sg_node] = (sources, dests)
+            continue
+        for src in sources:
+            for dest in dests:
+                if src != dest:
+                    pairs.add((src, dest))
+    return pairs, hubs
@@ -0,0 +1,114 @@
+# benchmarks/bench_cold_start.py
+"""
+Cold-start benchmark: import time and time-to-first-API-call.
+
+Each scenario runs in a fresh interpreter so nothing is already imported or
+cached, and is repeated N times (default 5); the median is reported.
+
+  eager     - the previous behaviour: boto3 and every collector imported up front
+  lazy      - `import lambda_function` as it is now
+  warm      - the same with WARM_CLIENTS=lambda,s3 (clients built during init)
+
+"first call" is a complete lambda:ListFunctions round trip - client creation,
+model loading, serialisation, signing and response parsing - answered by a
+canned HTTP response, so no network or real credentials are needed. A final
+section compares creating a client per call (the old get_client) with the
+shared cached clients.
+
+    python benchmarks/bench_cold_start.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SCENARIO = r'''
+import json, sys, time
+start = time.perf_counter()
+if EAGER:
+    import boto3
+    from collectors.registry import COLLECTORS
+    import importlib
+    for spec in COLLECTORS.values():
+        importlib.import_module(spec['module'])
+import lambda_function
+imported = time.perf_counter()
+
+import utils
+from botocore.awsrequest import AWSResponse
+
+class _Raw:
+    def stream(self):
+        yield b'{"Functions": []}'
+
+def _canned(request, **kwargs):
+    return AWSResponse(request.url, 200, {}, _Raw())
+
+client = utils.get_client('lambda')
+client.meta.events.register('before-send', _canned)
+client.list_functions()
+first_call = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_call': first_call - imported}))
+'''
+
+_CLIENT_REUSE = r'''
+import json, time
+import boto3
+from botocore.config import Config
+import utils
+config = Config(retries={'max_attempts': 8, 'mode': 'adaptive'})
+services = ['s3', 'ec2', 'lambda', 'sqs', 'dynamodb']
+for service in services:  # both paths start with every model already parsed
+    boto3.client(service, config=config)
+    utils.get_client(service)
+start = time.perf_counter()
+for _ in range(COUNT):
+    for service in services:
+        boto3.client(service, config=config)
+per_call = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(COUNT):
+    for service in services:
+        utils.get_client(service)
+shared = time.perf_counter() - start
+print(json.dumps({'per_call': per_call, 'shared': shared, 'calls': COUNT * len(services)}))
+'''
+
+
+def _run(source, extra_env=None):
+    env = dict(os.environ, S3_BUCKET_NAME='bench-bucket', AWS_DEFAULT_REGION='us-east-1',
+               AWS_ACCESS_KEY_ID='bench', AWS_SECRET_ACCESS_KEY='bench', AWS_EC2_METADATA_DISABLED='true')
+    env['PYTHONPATH'] = os.pathsep.join(p for p in (ROOT, env.get('PYTHONPATH')) if p)
+    env.pop('WARM_CLIENTS', None)
+    env.update(extra_env or {})
+    result = subprocess.run([sys.executable, '-c', source], env=env, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f"benchmark subprocess failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    scenarios = [
+        ('eager', 'EAGER = True\n', None),
+        ('lazy', 'EAGER = False\n', None),
+        ('warm', 'EAGER = False\n', {'WARM_CLIENTS': 'lambda,s3'}),
+    ]
+    print(f"{'scenario':<8} {'import (ms)':>12} {'first call (ms)':>16} {'total (ms)':>11}")
+    for name, prefix, extra_env in scenarios:
+        results = [_run(prefix + _SCENARIO, extra_env) for _ in range(runs)]
+        imported = statistics.median(r['import'] for r in results) * 1000
+        first_call = statistics.median(r['first_call'] for r in results) * 1000
+        print(f"{name:<8} {imported:>12.1f} {first_call:>16.1f} {imported + first_call:>11.1f}")
+
+    reuse = _run('COUNT = 20\n' + _CLIENT_REUSE)
+    print(f"\n{reuse['calls']} get_client calls: {reuse['per_call'] * 1000:.1f} ms creating a client per call, "
+          f"{reuse['shared'] * 1000:.1f} ms with shared clients")
+
+
+if __name__ == '__main__':
+    main()
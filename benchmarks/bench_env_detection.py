@@ -0,0 +1,124 @@
+# benchmarks/bench_env_detection.py
+"""
+Throughput benchmark for environment detection.
+
+Classifies N synthetic resource names (default 1,000,000) with the compiled,
+memoised EnvDetector in utils and with a verbatim copy of the previous
+per-call implementation, checks both agree, and prints names/second.
+
+    python benchmarks/bench_env_detection.py [count]
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import (  # noqa: E402
+    ENV_ALIASES, ENV_PRIORITY, ENV_TAG_KEYS, DEFAULT_ENV, EnvDetector, _normalize_tags,
+)
+
+
+# --- Previous implementation, kept here only as the baseline to beat ---
+
+def _legacy_tokenize(text):
+    if not text:
+        return []
+    s = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', ' ', str(text))
+    raw = [t for t in re.split(r'[^A-Za-z0-9]+', s.lower()) if t]
+    tokens = []
+    for t in raw:
+        stripped = re.sub(r'\d+$', '', t)
+        tokens.append(stripped if stripped else t)
+    return tokens
+
+
+def _legacy_match_tokens(tokens):
+    matches = []
+    i = 0
+    while i < len(tokens):
+        if i + 1 < len(tokens):
+            pair = tokens[i] + tokens[i + 1]
+            if pair in ENV_ALIASES:
+                matches.append(ENV_ALIASES[pair])
+                i += 2
+                continue
+        if tokens[i] in ENV_ALIASES:
+            matches.append(ENV_ALIASES[tokens[i]])
+        i += 1
+    return matches
+
+
+def _legacy_pick(matches):
+    if not matches:
+        return None
+    for env in ENV_PRIORITY:
+        if env in matches:
+            return env
+    return matches[0]
+
+
+def legacy_environment(name, tags=None):
+    for key, value in _normalize_tags(tags):
+        if key.lower() in ENV_TAG_KEYS:
+            env = _legacy_pick(_legacy_match_tokens(_legacy_tokenize(value)))
+            if env:
+                return env
+    return _legacy_pick(_legacy_match_tokens(_legacy_tokenize(name))) or DEFAULT_ENV
+
+
+# --- Synthetic workload ---
+
+_SERVICES = ['orders', 'payments', 'producer', 'latest', 'userApi', 'billing', 'search', 'auth']
+_KINDS = ['service', 'handler', 'db', 'queue', 'bucket', 'worker', 'cache']
+_ENVS = ['prod', 'Prd', 'pre-prod', 'staging', 'stg', 'uat', 'qa', 'test', 'dev', 'sandbox', 'demo', '']
+
+
+def synthetic_resources(count, distinct=10000, seed=42):
+    """Real accounts repeat names heavily (same stack per environment, same
+    tag values everywhere), so draw `count` items from a smaller pool."""
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(distinct):
+        parts = [rng.choice(_SERVICES), rng.choice(_KINDS), rng.choice(_ENVS)]
+        rng.shuffle(parts)
+        name = rng.choice(['-', '_', '.']).join(p for p in parts if p) + str(rng.randint(0, 99))
+        tags = None
+        if rng.random() < 0.4:
+            tags = [{'Key': 'Name', 'Value': name},
+                    {'Key': rng.choice(['Environment', 'env', 'Stage']), 'Value': rng.choice(_ENVS) or 'shared'}]
+        pool.append((name, tags))
+    return [pool[rng.randrange(distinct)] for _ in range(count)]
+
+
+def _run(label, fn, workload):
+    start = time.perf_counter()
+    results = [fn(name, tags) for name, tags in workload]
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.2f}s  {len(workload) / elapsed:>12,.0f} names/s")
+    return results, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    workload = synthetic_resources(count)
+    print(f"Classifying {count:,} synthetic names ({len(set(n for n, _ in workload)):,} distinct)\n")
+
+    legacy, legacy_time = _run("previous implementation", legacy_environment, workload)
+
+    detector = EnvDetector(ENV_ALIASES, ENV_PRIORITY, ENV_TAG_KEYS)
+    compiled, compiled_time = _run("compiled + LRU cache", lambda n, t: detector.details(n, t)['environment'], workload)
+
+    uncached = EnvDetector(ENV_ALIASES, ENV_PRIORITY, ENV_TAG_KEYS, cache_size=0)
+    _run("compiled, cache disabled", lambda n, t: uncached.details(n, t)['environment'], workload)
+
+    mismatches = sum(1 for a, b in zip(legacy, compiled) if a != b)
+    print(f"\nSpeed-up (cached vs previous): {legacy_time / compiled_time:.1f}x")
+    print(f"Cache: {detector.cache_info()}")
+    print(f"Disagreements with previous implementation: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
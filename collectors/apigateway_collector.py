@@ -1,5 +1,51 @@
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client
+from utils import get_environment_from_name, get_client, in_env_scope, parallel_map, paginate
+
+
+def _lambda_target(uri):
+    """Route target for an integration URI, naming the function for Lambda ones."""
+    if ':lambda:path' in uri and '/functions/' in uri:
+        # Handles non-proxy integrations
+        arn_part = uri.split('/functions/')[1]
+        function_arn = arn_part.split('/invocations')[0]
+        return f"Lambda: `{function_arn.split(':')[-1]}`"
+    if 'arn:aws:lambda' in uri:
+        # Handles proxy integrations
+        function_arn = uri.split('/invocations')[0]
+        return f"Lambda: `{function_arn.split(':')[-1]}`"
+    return uri # Default to the full URI if parsing fails
+
+
+def _http_api(apigw_v2_client, api):
+    """API Gateway v2 (HTTP/WebSocket) API with its routes."""
+    api_id = api['ApiId']
+    authorizers_map = {a['AuthorizerId']: a['Name'] for a in paginate(apigw_v2_client, 'get_authorizers', 'Items', ApiId=api_id)}
+    integrations = {i['IntegrationId']: i for i in paginate(apigw_v2_client, 'get_integrations', 'Items', ApiId=api_id)}
+    routes_details = []
+    for route in paginate(apigw_v2_client, 'get_routes', 'Items', ApiId=api_id):
+        target = route.get('Target', 'N/A')
+        if 'integrations/' in target:
+            integration_detail = integrations.get(target.split('/')[-1])
+            if integration_detail and 'IntegrationUri' in integration_detail:
+                # Extracts function name from ARN
+                target = f"Lambda: `{integration_detail['IntegrationUri'].split(':')[-1].split('}')[0]}`"
+        routes_details.append({ 'RouteKey': route['RouteKey'], 'Authorizer': authorizers_map.get(route.get('AuthorizerId'), 'None'), 'Target': target })
+    return { 'Name': api['Name'], 'ApiId': api_id, 'ProtocolType': api['ProtocolType'], 'Routes': sorted(routes_details, key=lambda x: x['RouteKey']), 'Environment': get_environment_from_name(api['Name'], api.get('Tags', {})) }
+
+
+def _rest_api(apigw_v1_client, api):
+    """API Gateway v1 (REST) API with its routes. Methods and their
+    integrations are embedded in the resource listing, so each API costs one
+    paginated get_resources call plus its authorizers."""
+    api_id = api['id']
+    authorizers_map = {a['id']: a['name'] for a in paginate(apigw_v1_client, 'get_authorizers', 'items', restApiId=api_id)}
+    routes_details = []
+    for resource in paginate(apigw_v1_client, 'get_resources', 'items', restApiId=api_id, embed=['methods']):
+        for method_name, method_details in resource.get('resourceMethods', {}).items():
+            uri = method_details.get('methodIntegration', {}).get('uri', 'N/A')
+            routes_details.append({ 'RouteKey': f"{method_name} {resource['path']}", 'Authorizer': authorizers_map.get(method_details.get('authorizerId'), 'None'), 'Target': _lambda_target(uri) })
+    return { 'Name': api['name'], 'ApiId': api_id, 'ProtocolType': 'REST', 'Routes': sorted(routes_details, key=lambda x: x['RouteKey']), 'Environment': get_environment_from_name(api['name'], api.get('tags', {})) }
+
 
 def get_apigateway_data():
     """
@@ -7,52 +53,17 @@ def get_apigateway_data():
     Handles both v1 (REST) and v2 (HTTP/WebSocket) APIs.
     """
     try:
-        apis_data = []
-        
         # --- API Gateway v2 (HTTP/WebSocket) ---
         apigw_v2_client = get_client('apigatewayv2')
-        for api in apigw_v2_client.get_apis()['Items']:
-            api_id = api['ApiId']
-            authorizers_map = {a['AuthorizerId']: a['Name'] for a in apigw_v2_client.get_authorizers(ApiId=api_id).get('Items', [])}
-            integrations = apigw_v2_client.get_integrations(ApiId=api_id).get('Items', [])
-            routes_details = []
-            for route in apigw_v2_client.get_routes(ApiId=api_id).get('Items', []):
-                target = route.get('Target', 'N/A')
-                if 'integrations/' in target:
-                    integration_id = target.split('/')[-1]
-                    integration_detail = next((i for i in integrations if i['IntegrationId'] == integration_id), None)
-                    if integration_detail and 'IntegrationUri' in integration_detail:
-                        # Extracts function name from ARN
-                        target = f"Lambda: `{integration_detail['IntegrationUri'].split(':')[-1].split('}')[0]}`"
-                routes_details.append({ 'RouteKey': route['RouteKey'], 'Authorizer': authorizers_map.get(route.get('AuthorizerId'), 'None'), 'Target': target })
-            apis_data.append({ 'Name': api['Name'], 'ApiId': api_id, 'ProtocolType': api['ProtocolType'], 'Routes': sorted(routes_details, key=lambda x: x['RouteKey']), 'Environment': get_environment_from_name(api['Name'], api.get('Tags', {})) })
+        http_apis = [api for api in paginate(apigw_v2_client, 'get_apis', 'Items')
+                     if in_env_scope(api['Name'], tags=api.get('Tags', {}))]
+        apis_data = parallel_map(lambda api: _http_api(apigw_v2_client, api), http_apis)
 
         # --- API Gateway v1 (REST) ---
         apigw_v1_client = get_client('apigateway')
-        for api in apigw_v1_client.get_rest_apis()['items']:
-            api_id = api['id']
-            authorizers_map = {a['id']: a['name'] for a in apigw_v1_client.get_authorizers(restApiId=api_id).get('items', [])}
-            routes_details = []
-            resources = apigw_v1_client.get_resources(restApiId=api_id).get('items', [])
-            for resource in resources:
-                if 'resourceMethods' not in resource: continue
-                for method_name, method_details in resource.get('resourceMethods', {}).items():
-                    integration = method_details.get('methodIntegration', {})
-                    uri = integration.get('uri', 'N/A')
-                    target = uri # Default to the full URI if parsing fails
-
-                    if ':lambda:path' in uri and '/functions/' in uri:
-                        # Handles non-proxy integrations
-                        arn_part = uri.split('/functions/')[1]
-                        function_arn = arn_part.split('/invocations')[0]
-                        target = f"Lambda: `{function_arn.split(':')[-1]}`"
-                    elif 'arn:aws:lambda' in uri:
-                        # Handles proxy integrations
-                        function_arn = uri.split('/invocations')[0]
-                        target = f"Lambda: `{function_arn.split(':')[-1]}`"
-                    
-                    routes_details.append({ 'RouteKey': f"{method_name} {resource['path']}", 'Authorizer': authorizers_map.get(method_details.get('authorizerId'), 'None'), 'Target': target })
-            apis_data.append({ 'Name': api['name'], 'ApiId': api_id, 'ProtocolType': 'REST', 'Routes': sorted(routes_details, key=lambda x: x['RouteKey']), 'Environment': get_environment_from_name(api['name'], api.get('tags', {})) })
+        rest_apis = [api for api in paginate(apigw_v1_client, 'get_rest_apis', 'items')
+                     if in_env_scope(api['name'], tags=api.get('tags', {}))]
+        apis_data.extend(parallel_map(lambda api: _rest_api(apigw_v1_client, api), rest_apis))
 
         return {'apis': apis_data}
     except ClientError as e:
@@ -61,4 +72,4 @@ def get_apigateway_data():
             return {'error': '(NO IAM ACCESS)', 'apis': []}
         else:
             print(f"An unexpected Boto3 error occurred in get_apigateway_data: {e}")
-            raise e
\ No newline at end of file
+            raise e
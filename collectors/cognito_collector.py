@@ -1,6 +1,45 @@
 # collectors/cognito_collector.py
+import os
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, in_env_scope, parallel_map, SKIP_TAG_LOOKUPS
+
+# Pools enriched at once. Cognito's per-account read quotas are far lower
+# than other services', so this stays below COLLECTOR_MAX_WORKERS.
+COGNITO_MAX_WORKERS = int(os.environ.get('COGNITO_MAX_WORKERS', '4'))
+
+
+def _user_pool(cognito_client, pool):
+    pool_id = pool['Id']
+    pool_name = pool['Name']
+
+    # Get app clients for each user pool
+    app_clients = []
+    client_paginator = cognito_client.get_paginator('list_user_pool_clients')
+    for client_page in client_paginator.paginate(UserPoolId=pool_id, MaxResults=50):
+        for client in client_page.get('UserPoolClients', []):
+            app_clients.append({
+                'ClientName': client['ClientName'],
+                'ClientId': client['ClientId']
+            })
+
+    # list_user_pools omits tags; describe_user_pool returns them along with
+    # the pool metadata the report shows, so it is called once for both.
+    try:
+        details = cognito_client.describe_user_pool(UserPoolId=pool_id).get('UserPool', {})
+    except ClientError as e:
+        print(f"WARN: could not describe Cognito user pool {pool_name}: {e}")
+        details = {}
+    tags = None if SKIP_TAG_LOOKUPS else details.get('UserPoolTags')
+
+    return {
+        'Name': pool_name,
+        'Id': pool_id,
+        'AppClients': app_clients,
+        'MfaConfiguration': details.get('MfaConfiguration', 'N/A'),
+        'EstimatedUsers': details.get('EstimatedNumberOfUsers', 'N/A'),
+        'Environment': get_environment_from_name(pool_name, tags)
+    }
+
 
 def get_cognito_data():
     """
@@ -9,36 +48,16 @@ def get_cognito_data():
     """
     try:
         cognito_client = get_client('cognito-idp')
-        user_pools_data = []
         
+        pools = []
         paginator = cognito_client.get_paginator('list_user_pools')
         for page in paginator.paginate(MaxResults=50):
-            for pool in page['UserPools']:
-                pool_id = pool['Id']
-                pool_name = pool['Name']
-                
-                # Get app clients for each user pool
-                app_clients = []
-                client_paginator = cognito_client.get_paginator('list_user_pool_clients')
-                for client_page in client_paginator.paginate(UserPoolId=pool_id, MaxResults=50):
-                    for client in client_page.get('UserPoolClients', []):
-                        app_clients.append({
-                            'ClientName': client['ClientName'],
-                            'ClientId': client['ClientId']
-                        })
-
-                # list_user_pools omits tags; describe_user_pool returns them.
-                tags = safe_tags(
-                    lambda pid=pool_id: cognito_client.describe_user_pool(UserPoolId=pid).get('UserPool', {}).get('UserPoolTags', {}),
-                    f"Cognito user pool {pool_name}"
-                )
-
-                user_pools_data.append({
-                    'Name': pool_name,
-                    'Id': pool_id,
-                    'AppClients': app_clients,
-                    'Environment': get_environment_from_name(pool_name, tags)
-                })
+            pools.extend(pool for pool in page['UserPools']
+                         if in_env_scope(pool['Name'], key=('cognito-idp', pool['Id'])))
+
+        user_pools_data = parallel_map(
+            lambda pool: _user_pool(cognito_client, pool), pools, max_workers=COGNITO_MAX_WORKERS
+        )
         
         return {'user_pools': user_pools_data}
     except ClientError as e:
@@ -47,4 +66,4 @@ def get_cognito_data():
             return {'error': '(NO IAM ACCESS)', 'user_pools': []}
         else:
             print(f"An unexpected Boto3 error occurred in get_cognito_data: {e}")
-            raise e
\ No newline at end of file
+            raise e
@@ -1,6 +1,73 @@
 # collectors/dynamodb_collector.py
+import os
+import time
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_details, record_environment, replay_environment, get_client, safe_tags, in_env_scope, parallel_map, RateLimiter
+from snapshots import previous_snapshot
+
+# describe_table calls per second across all worker threads.
+DYNAMODB_DESCRIBE_RATE = float(os.environ.get('DYNAMODB_DESCRIBE_RATE', '20'))
+# Seconds a table's tags (and so its environment) are reused from the previous
+# snapshot while the table's definition is unchanged. 0 always refetches.
+DYNAMODB_TAG_MAX_AGE = int(os.environ.get('DYNAMODB_TAG_MAX_AGE', str(7 * 86400)))
+
+
+def _definition(details, billing_mode):
+    """The fields that identify a table's definition; when these match the
+    previous snapshot's entry, the table is the same one, unchanged."""
+    return {
+        'TableArn': details.get('TableArn'),
+        'CreationDateTime': str(details.get('CreationDateTime')),
+        'BillingMode': billing_mode,
+        'GlobalSecondaryIndexes': sorted(index['IndexName'] for index in details.get('GlobalSecondaryIndexes', [])),
+    }
+
+
+def _table(dynamodb_client, limiter, table_name, previous):
+    limiter.wait()
+    details = dynamodb_client.describe_table(TableName=table_name).get('Table', {})
+
+    # Format the primary key schema
+    key_schema = []
+    for key in details.get('KeySchema', []):
+        key_type = "HASH" if key['KeyType'] == 'HASH' else "RANGE"
+        key_schema.append(f"{key['AttributeName']} ({key_type})")
+
+    # Determine billing mode
+    billing_mode = "PROVISIONED"
+    if 'BillingModeSummary' in details and details['BillingModeSummary']['BillingMode'] == 'PAY_PER_REQUEST':
+        billing_mode = "On-Demand"
+    definition = _definition(details, billing_mode)
+
+    if (previous and all(previous.get(field) == value for field, value in definition.items())
+            and time.time() - previous.get('TagsCheckedAt', 0) < DYNAMODB_TAG_MAX_AGE):
+        # Unchanged table: keep its environment, skipping the tag lookup.
+        environment, tags_checked_at = previous['Environment'], previous['TagsCheckedAt']
+        source = previous.get('EnvironmentSource', 'snapshot')
+        replay_environment(table_name, environment, source)
+    else:
+        tags = safe_tags(
+            lambda arn=details.get('TableArn'): dynamodb_client.list_tags_of_resource(ResourceArn=arn).get('Tags', []),
+            f"DynamoDB table {table_name}"
+        ) if details.get('TableArn') else None
+        env_details = get_environment_details(table_name, tags)
+        environment, source = record_environment(table_name, env_details), env_details['source']
+        # Without tags (throttled, denied or SKIP_TAG_LOOKUPS) the name-only
+        # environment is not reused; the next run asks for the tags again.
+        tags_checked_at = time.time() if tags is not None else 0
+
+    return {
+        'Name': table_name,
+        'Status': details.get('TableStatus'),
+        'ItemCount': details.get('ItemCount', 0),
+        'TableSizeMB': round(details.get('TableSizeBytes', 0) / (1024 * 1024), 2),
+        'PrimaryKey': ", ".join(key_schema),
+        **definition,
+        'TagsCheckedAt': tags_checked_at,
+        'EnvironmentSource': source,
+        'Environment': environment
+    }
+
 
 def get_dynamodb_data():
     """
@@ -9,38 +76,18 @@ def get_dynamodb_data():
     """
     try:
         dynamodb_client = get_client('dynamodb')
-        tables_data = []
         
+        table_names = []
         paginator = dynamodb_client.get_paginator('list_tables')
         for page in paginator.paginate():
-            for table_name in page.get('TableNames', []):
-                details = dynamodb_client.describe_table(TableName=table_name).get('Table', {})
-                
-                # Format the primary key schema
-                key_schema = []
-                for key in details.get('KeySchema', []):
-                    key_type = "HASH" if key['KeyType'] == 'HASH' else "RANGE"
-                    key_schema.append(f"{key['AttributeName']} ({key_type})")
-
-                # Determine billing mode
-                billing_mode = "PROVISIONED"
-                if 'BillingModeSummary' in details and details['BillingModeSummary']['BillingMode'] == 'PAY_PER_REQUEST':
-                    billing_mode = "On-Demand"
-                
-                tags = safe_tags(
-                    lambda arn=details.get('TableArn'): dynamodb_client.list_tags_of_resource(ResourceArn=arn).get('Tags', []),
-                    f"DynamoDB table {table_name}"
-                ) if details.get('TableArn') else None
-
-                tables_data.append({
-                    'Name': table_name,
-                    'Status': details.get('TableStatus'),
-                    'ItemCount': details.get('ItemCount', 0),
-                    'TableSizeMB': round(details.get('TableSizeBytes', 0) / (1024 * 1024), 2),
-                    'PrimaryKey': ", ".join(key_schema),
-                    'BillingMode': billing_mode,
-                    'Environment': get_environment_from_name(table_name, tags)
-                })
+            table_names.extend(name for name in page.get('TableNames', [])
+                               if in_env_scope(name, key=('dynamodb', name)))
+
+        previous = {table['Name']: table for table in (previous_snapshot('dynamodb') or {}).get('tables', [])}
+        limiter = RateLimiter(DYNAMODB_DESCRIBE_RATE)
+        tables_data = parallel_map(
+            lambda name: _table(dynamodb_client, limiter, name, previous.get(name)), table_names
+        )
         
         return {'tables': tables_data}
     except ClientError as e:
@@ -49,4 +96,4 @@ def get_dynamodb_data():
             return {'error': '(NO IAM ACCESS)', 'tables': []}
         else:
             print(f"An unexpected Boto3 error occurred in get_dynamodb_data: {e}")
-            raise e
\ No newline at end of file
+            raise e
@@ -2,6 +2,66 @@
 from botocore.exceptions import ClientError
 from utils import get_environment_from_name, get_client
 
+def _attribute_eni(eni):
+    """Works out which resource owns an ENI from its InterfaceType,
+    RequesterId, attachment, tags and description. Returns
+    (resource_type, resource_name); the types match analysis.resource_graph
+    node types so owners already collected resolve to the same node."""
+    interface_type = eni.get('InterfaceType', 'interface')
+    requester = eni.get('RequesterId', '') or ''
+    description = eni.get('Description', '') or ''
+    tags = {t['Key']: t['Value'] for t in eni.get('TagSet', [])}
+
+    if instance_id := eni.get('Attachment', {}).get('InstanceId'):
+        return 'ec2', instance_id
+    if interface_type == 'nat_gateway':
+        return 'nat', description.split()[-1] if description else eni['NetworkInterfaceId']
+    if interface_type in ('vpc_endpoint', 'gateway_load_balancer_endpoint'):
+        return 'vpce', description.split()[-1] if description else eni['NetworkInterfaceId']
+    if interface_type == 'lambda' or description.startswith('AWS Lambda VPC ENI'):
+        return 'lambda', description.replace('AWS Lambda VPC ENI-', '', 1)
+    if description.startswith('ELB '):
+        # 'ELB app/<name>/<id>', 'ELB net/<name>/<id>' or 'ELB <classic-name>'
+        parts = description[4:].split('/')
+        return 'lb', parts[1] if len(parts) > 1 else parts[0]
+    if 'aws:ecs:serviceName' in tags:
+        return 'ecs', tags['aws:ecs:serviceName']
+    if description.startswith('arn:aws:ecs:') or requester == 'amazon-ecs':
+        return 'ecs_task', eni['NetworkInterfaceId']
+    if description.startswith('ElastiCache ') or requester == 'amazon-elasticache':
+        return 'elasticache', description.split()[-1] if description else eni['NetworkInterfaceId']
+    if requester == 'amazon-rds' or description == 'RDSNetworkInterface':
+        # RDS and Neptune share this requester and the ENI doesn't name the
+        # instance; the graph matches it to a collected DB by its SGs.
+        return 'rds_eni', eni['NetworkInterfaceId']
+    return 'eni', description or eni['NetworkInterfaceId']
+
+
+def _get_network_interfaces(ec2_client):
+    """One paginated describe_network_interfaces pass covering every
+    resource type that can hold a security group. Requires
+    ec2:DescribeNetworkInterfaces; without it the SG cross-reference falls
+    back to the per-collector fields."""
+    interfaces = []
+    try:
+        paginator_eni = ec2_client.get_paginator('describe_network_interfaces')
+        for page in paginator_eni.paginate():
+            for eni in page.get('NetworkInterfaces', []):
+                resource_type, resource_name = _attribute_eni(eni)
+                interfaces.append({
+                    'NetworkInterfaceId': eni['NetworkInterfaceId'],
+                    'SubnetId': eni.get('SubnetId'),
+                    'VpcId': eni.get('VpcId'),
+                    'InterfaceType': eni.get('InterfaceType', 'interface'),
+                    'SecurityGroupIds': [g['GroupId'] for g in eni.get('Groups', [])],
+                    'ResourceType': resource_type,
+                    'ResourceName': resource_name,
+                })
+    except ClientError as e:
+        print(f"WARN: could not describe network interfaces, SG cross-reference will be partial: {e}")
+    return interfaces
+
+
 def get_ec2_data():
     """
     Fetches data for EC2 instances, Security Groups, and Subnets.
@@ -31,6 +91,7 @@ def get_ec2_data():
                 sg_data.append({
                     'Name': sg_name,
                     'GroupId': sg['GroupId'],
+                    'VpcId': sg.get('VpcId'),
                     'InboundRules': sg.get('IpPermissions', []),
                     'OutboundRules': sg.get('IpPermissionsEgress', []),
                     'Environment': get_environment_from_name(sg_name, sg.get('Tags', []))
@@ -51,18 +112,22 @@ def get_ec2_data():
                         'Environment': get_environment_from_name(name, instance.get('Tags', []))
                     })
 
+        # --- Get Network Interfaces (SG -> ENI -> resource) ---
+        network_interfaces = _get_network_interfaces(ec2_client)
+
         return {
             'instances': instances_data, 
             'security_groups': sg_data,
             'subnet_map': subnet_map,
-            'sg_map': sg_map
+            'sg_map': sg_map,
+            'network_interfaces': network_interfaces
         }
     except ClientError as e:
         # If any of the above API calls fail due to permissions, catch the error
         if 'AccessDenied' in str(e):
             print("Access Denied for EC2/VPC services. Skipping EC2 data collection.")
             # Return a dictionary with an error flag and empty data structures
-            return {'error': '(NO IAM ACCESS)', 'instances': [], 'security_groups': [], 'subnet_map': {}, 'sg_map': {}}
+            return {'error': '(NO IAM ACCESS)', 'instances': [], 'security_groups': [], 'subnet_map': {}, 'sg_map': {}, 'network_interfaces': []}
         else:
             # If it's a different error, we still want the function to stop
             print(f"An unexpected Boto3 error occurred in get_ec2_data: {e}")
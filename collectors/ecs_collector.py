@@ -1,6 +1,6 @@
 # collectors/ecs_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope, parallel_map, paginate
 
 
 def _chunk(items, size):
@@ -9,6 +9,38 @@ def _chunk(items, size):
     for i in range(0, len(items), size):
         yield items[i:i + size]
 
+
+def _describe_services(ecs_client, cluster_name):
+    """Every service in one cluster, described 10 at a time."""
+    service_arns = list(paginate(ecs_client, 'list_services', 'serviceArns', cluster=cluster_name))
+    services = []
+    for batch in _chunk(service_arns, 10):
+        services.extend(ecs_client.describe_services(cluster=cluster_name, services=batch).get('services', []))
+    return services
+
+
+def _task_definition_summary(ecs_client, task_definition_arn):
+    """Container images and task-level CPU/memory of one task definition.
+
+    A failed lookup (e.g. a role without ecs:DescribeTaskDefinition) only
+    blanks these columns for the services using it, like safe_tags does for
+    tags, rather than failing the whole container collector.
+    """
+    try:
+        task_definition = ecs_client.describe_task_definition(taskDefinition=task_definition_arn)['taskDefinition']
+    except ClientError as e:
+        print(f"WARN: could not describe ECS task definition {task_definition_arn}: {e}")
+        return {'TaskDefinition': task_definition_arn.split('/')[-1], 'Images': [], 'Cpu': 'N/A', 'Memory': 'N/A'}
+    containers = task_definition.get('containerDefinitions', [])
+    return {
+        'TaskDefinition': f"{task_definition['family']}:{task_definition['revision']}",
+        'Images': [container['image'] for container in containers if container.get('image')],
+        # EC2 launch types may size containers individually instead of the task.
+        'Cpu': task_definition.get('cpu') or sum(container.get('cpu', 0) for container in containers) or 'N/A',
+        'Memory': task_definition.get('memory') or sum(container.get('memory', 0) for container in containers) or 'N/A',
+    }
+
+
 def get_container_data():
     """
     Fetches detailed information about ECR, EKS, and ECS resources.
@@ -24,23 +56,27 @@ def get_container_data():
         ecs_clusters = []
 
         # 1. Get ECR Repositories
-        paginator_ecr = ecr_client.get_paginator('describe_repositories')
-        for page in paginator_ecr.paginate():
-            for repo in page.get('repositories', []):
-                tags = safe_tags(
-                    lambda arn=repo['repositoryArn']: ecr_client.list_tags_for_resource(resourceArn=arn).get('tags', []),
-                    f"ECR repository {repo['repositoryName']}"
-                )
-                ecr_repos.append({
-                    'Name': repo['repositoryName'],
-                    'URI': repo['repositoryUri'],
-                    'Environment': get_environment_from_name(repo['repositoryName'], tags)
-                })
+        repos = [repo for repo in paginate(ecr_client, 'describe_repositories', 'repositories')
+                 if in_env_scope(repo['repositoryName'], arn=repo['repositoryArn'])]
+        repo_tags = parallel_map(
+            lambda repo: safe_tags(
+                lambda: ecr_client.list_tags_for_resource(resourceArn=repo['repositoryArn']).get('tags', []),
+                f"ECR repository {repo['repositoryName']}"
+            ),
+            repos
+        )
+        for repo, tags in zip(repos, repo_tags):
+            ecr_repos.append({
+                'Name': repo['repositoryName'],
+                'URI': repo['repositoryUri'],
+                'Environment': get_environment_from_name(repo['repositoryName'], tags)
+            })
 
         # 2. Get EKS Clusters
-        cluster_names = eks_client.list_clusters().get('clusters', [])
-        for name in cluster_names:
-            cluster_details = eks_client.describe_cluster(name=name).get('cluster', {})
+        eks_names = [name for name in paginate(eks_client, 'list_clusters', 'clusters')
+                     if in_env_scope(name, key=('eks', name))]
+        for name, cluster_details in zip(eks_names, parallel_map(
+                lambda name: eks_client.describe_cluster(name=name).get('cluster', {}), eks_names)):
             eks_clusters.append({
                 'Name': name,
                 'Version': cluster_details.get('version'),
@@ -50,39 +86,50 @@ def get_container_data():
             })
 
         # 3. Get ECS Clusters and their Services
-        cluster_arns = ecs_client.list_clusters().get('clusterArns', [])
-        if cluster_arns:
-            described_clusters = []
-            for batch in _chunk(cluster_arns, 100):
-                described_clusters.extend(
-                    ecs_client.describe_clusters(clusters=batch, include=['TAGS']).get('clusters', [])
-                )
-            for cluster in described_clusters:
-                cluster_name = cluster['clusterName']
-                
-                # Get services within the cluster
-                services_data = []
-                paginator_ecs_services = ecs_client.get_paginator('list_services')
-                for page in paginator_ecs_services.paginate(cluster=cluster_name):
-                    service_arns = page.get('serviceArns', [])
-                    for batch in _chunk(service_arns, 10):
-                        described_services = ecs_client.describe_services(cluster=cluster_name, services=batch).get('services', [])
-                        for service in described_services:
-                            services_data.append({
-                                'Name': service['serviceName'],
-                                'Status': service['status'],
-                                'LaunchType': service.get('launchType', 'N/A'),
-                                'DesiredCount': service.get('desiredCount')
-                            })
-
-                ecs_clusters.append({
-                    'Name': cluster_name,
-                    'Status': cluster['status'],
-                    'Services': services_data,
-                    # ECS returns lowercase {'key','value'} tags; utils normalises this.
-                    'Environment': get_environment_from_name(cluster_name, cluster.get('tags'))
+        cluster_arns = [arn for arn in paginate(ecs_client, 'list_clusters', 'clusterArns')
+                        if in_env_scope(arn.split('/')[-1], arn=arn)]
+        described_clusters = []
+        for batch in _chunk(cluster_arns, 100):
+            described_clusters.extend(
+                ecs_client.describe_clusters(clusters=batch, include=['TAGS']).get('clusters', [])
+            )
+        services_by_cluster = parallel_map(
+            lambda cluster: _describe_services(ecs_client, cluster['clusterName']), described_clusters
+        )
+
+        # Services commonly share a task definition revision; describe each once.
+        task_definition_arns = list(dict.fromkeys(
+            service['taskDefinition'] for services in services_by_cluster for service in services
+            if service.get('taskDefinition')
+        ))
+        task_definitions = dict(zip(task_definition_arns, parallel_map(
+            lambda arn: _task_definition_summary(ecs_client, arn), task_definition_arns
+        )))
+
+        for cluster, services in zip(described_clusters, services_by_cluster):
+            cluster_name = cluster['clusterName']
+            services_data = []
+            for service in services:
+                task_definition = task_definitions.get(service.get('taskDefinition'), {})
+                services_data.append({
+                    'Name': service['serviceName'],
+                    'Status': service['status'],
+                    'LaunchType': service.get('launchType', 'N/A'),
+                    'DesiredCount': service.get('desiredCount'),
+                    'TaskDefinition': task_definition.get('TaskDefinition', 'N/A'),
+                    'Images': task_definition.get('Images', []),
+                    'Cpu': task_definition.get('Cpu', 'N/A'),
+                    'Memory': task_definition.get('Memory', 'N/A')
                 })
 
+            ecs_clusters.append({
+                'Name': cluster_name,
+                'Status': cluster['status'],
+                'Services': services_data,
+                # ECS returns lowercase {'key','value'} tags; utils normalises this.
+                'Environment': get_environment_from_name(cluster_name, cluster.get('tags'))
+            })
+
         return {
             'ecr_repositories': ecr_repos,
             'eks_clusters': eks_clusters,
@@ -1,6 +1,6 @@
 # collectors/elasticache_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope
 
 def get_elasticache_data():
     """
@@ -15,6 +15,8 @@ def get_elasticache_data():
         paginator_redis = elasticache_client.get_paginator('describe_replication_groups')
         for page in paginator_redis.paginate():
             for group in page.get('ReplicationGroups', []):
+                if not in_env_scope(group['ReplicationGroupId'], key=('elasticache', group['ReplicationGroupId'])):
+                    continue
                 primary_endpoint = group.get('NodeGroups', [{}])[0].get('PrimaryEndpoint', {})
                 endpoint_address = primary_endpoint.get('Address', 'N/A')
                 
@@ -35,10 +37,12 @@ def get_elasticache_data():
         
         # 2. Get all cache clusters and find the standalone Memcached ones
         paginator_mc = elasticache_client.get_paginator('describe_cache_clusters')
-        for page in paginator_mc.paginate(ShowCacheNodeInfo=True):
+        # ConfigurationEndpoint is returned without ShowCacheNodeInfo, which
+        # would add per-node detail for every cluster, Redis members included.
+        for page in paginator_mc.paginate():
             for cluster in page.get('CacheClusters', []):
                 # We only care about clusters that are NOT part of a Redis replication group
-                if cluster['Engine'] == 'memcached':
+                if cluster['Engine'] == 'memcached' and in_env_scope(cluster['CacheClusterId'], key=('elasticache', cluster['CacheClusterId'])):
                     endpoint = cluster.get('ConfigurationEndpoint', {})
                     endpoint_address = endpoint.get('Address', 'N/A')
                     
@@ -1,6 +1,27 @@
 # collectors/eventbridge_collector.py
+import os
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope, indexed_tags, paginate, parallel_map, DEFAULT_ENV
+
+# Concurrent rule lookups (targets and tags) per bus. Kept below COLLECTOR_MAX_WORKERS
+# as the EventBridge control plane throttles at a few requests per second.
+EVENTBRIDGE_TARGET_WORKERS = int(os.environ.get('EVENTBRIDGE_TARGET_WORKERS', '4'))
+
+
+def _rule_details(events_client, bus_name, rule):
+    """A rule's targets and tags. The tags come from the run's tagging-API
+    index when there is one, and from one call per rule otherwise."""
+    targets = []
+    paginator = events_client.get_paginator('list_targets_by_rule')
+    for page in paginator.paginate(Rule=rule['Name'], EventBusName=bus_name):
+        targets.extend({'Id': t.get('Id', 'N/A'), 'Arn': t.get('Arn', 'N/A')} for t in page.get('Targets', []))
+    tags = indexed_tags(rule.get('Arn'))
+    if tags is None and rule.get('Arn'):
+        tags = safe_tags(
+            lambda arn=rule['Arn']: events_client.list_tags_for_resource(ResourceARN=arn).get('Tags', []),
+            f"EventBridge rule {rule['Name']}"
+        )
+    return targets, tags
 
 
 def get_eventbridge_data():
@@ -13,43 +34,47 @@ def get_eventbridge_data():
         events_client = get_client('events')
         buses_data = []
 
-        paginator_buses = events_client.get_paginator('list_event_buses')
-        for page in paginator_buses.paginate():
-            for bus in page.get('EventBuses', []):
-                bus_name = bus['Name']
-
-                rules_data = []
-                paginator_rules = events_client.get_paginator('list_rules')
-                for rule_page in paginator_rules.paginate(EventBusName=bus_name):
-                    for rule in rule_page.get('Rules', []):
-                        rule_name = rule['Name']
-
-                        targets = events_client.list_targets_by_rule(
-                            Rule=rule_name, EventBusName=bus_name
-                        ).get('Targets', [])
-                        targets_data = [{'Id': t.get('Id', 'N/A'), 'Arn': t.get('Arn', 'N/A')} for t in targets]
-
-                        rules_data.append({
-                            'Name': rule_name,
-                            'State': rule.get('State', 'N/A'),
-                            'ScheduleExpression': rule.get('ScheduleExpression', 'N/A'),
-                            'HasEventPattern': 'EventPattern' in rule,
-                            'Targets': targets_data
-                        })
-
-                bus_arn = bus.get('Arn')
-                tags = safe_tags(
-                    lambda arn=bus_arn: events_client.list_tags_for_resource(ResourceARN=arn).get('Tags', []),
-                    f"EventBridge bus {bus_name}"
-                ) if bus_arn else None
-
-                buses_data.append({
-                    'Name': bus_name,
-                    'Arn': bus.get('Arn', 'N/A'),
-                    'Rules': rules_data,
-                    'Environment': get_environment_from_name(bus_name, tags)
+        # list_event_buses has no boto3 paginator; paginate follows NextToken.
+        for bus in paginate(events_client, 'list_event_buses', 'EventBuses'):
+            bus_name = bus['Name']
+            bus_arn = bus.get('Arn')
+            tags = safe_tags(
+                lambda arn=bus_arn: events_client.list_tags_for_resource(ResourceARN=arn).get('Tags', []),
+                f"EventBridge bus {bus_name}"
+            ) if bus_arn else None
+            bus_environment = get_environment_from_name(bus_name, tags)
+
+            # Buses are not scoped: most rules sit on the uncategorised
+            # 'default' bus whatever their own environment. Each rule is
+            # scoped before its targets and tags are fetched instead.
+            rules = [rule for rule in paginate(events_client, 'list_rules', 'Rules', EventBusName=bus_name)
+                     if in_env_scope(rule['Name'], arn=rule.get('Arn'), fallback_env=bus_environment)]
+            details_by_rule = parallel_map(
+                lambda rule: _rule_details(events_client, bus_name, rule),
+                rules, max_workers=EVENTBRIDGE_TARGET_WORKERS
+            )
+
+            rules_data = []
+            for rule, (targets_data, rule_tags) in zip(rules, details_by_rule):
+                # Most rules live on the uncategorised 'default' bus, so a
+                # rule's own name and tags decide; the bus is the fallback.
+                rule_environment = get_environment_from_name(rule['Name'], rule_tags)
+                rules_data.append({
+                    'Name': rule['Name'],
+                    'State': rule.get('State', 'N/A'),
+                    'ScheduleExpression': rule.get('ScheduleExpression', 'N/A'),
+                    'HasEventPattern': 'EventPattern' in rule,
+                    'Targets': targets_data,
+                    'Environment': rule_environment if rule_environment != DEFAULT_ENV else bus_environment
                 })
 
+            buses_data.append({
+                'Name': bus_name,
+                'Arn': bus.get('Arn', 'N/A'),
+                'Rules': rules_data,
+                'Environment': bus_environment
+            })
+
         return {'event_buses': buses_data}
     except ClientError as e:
         if 'AccessDenied' in str(e):
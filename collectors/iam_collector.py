@@ -1,6 +1,6 @@
 # collectors/iam_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope
 
 ADMIN_POLICY_ARN = 'arn:aws:iam::aws:policy/AdministratorAccess'
 
@@ -60,6 +60,8 @@ def get_iam_data():
         for page in paginator_roles.paginate():
             for role in page['Roles']:
                 role_name = role['RoleName']
+                if not in_env_scope(role_name, key=('iam', role_name)):
+                    continue
                 # list_roles does NOT return tags, so role.get('Tags') was always
                 # empty and environment detection silently fell back to the name.
                 tags = safe_tags(
@@ -108,6 +110,8 @@ def get_iam_data():
         for page in paginator_users.paginate():
             for user in page['Users']:
                 user_name = user['UserName']
+                if not in_env_scope(user_name, key=('iam', user_name)):
+                    continue
                 # list_users does NOT return tags either.
                 tags = safe_tags(
                     lambda n=user_name: iam_client.list_user_tags(UserName=n).get('Tags', []),
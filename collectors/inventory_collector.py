@@ -0,0 +1,234 @@
+# collectors/inventory_collector.py
+from botocore.exceptions import ClientError
+from utils import get_environment_from_name, get_client, arn_key, paginate
+from collectors.neptune_collector import NEPTUNE_ENGINE_FILTER
+
+
+def _name_tag(tags, default):
+    return next((tag['Value'] for tag in tags or [] if tag['Key'] == 'Name'), default)
+
+
+def get_tag_index():
+    """
+    One sweep of the Resource Groups Tagging API, mapping each tagged
+    resource's (service, id) to its tags. Untagged resources are not returned
+    here - the per-service list calls below pick those up. Also used to
+    pre-resolve environment scope (see utils.EnvScope).
+    """
+    tagging_client = get_client('resourcegroupstaggingapi')
+    tag_index = {}
+    paginator = tagging_client.get_paginator('get_resources')
+    for page in paginator.paginate(ResourcesPerPage=100):
+        for mapping in page.get('ResourceTagMappingList', []):
+            key = arn_key(mapping['ResourceARN'])
+            if key:
+                tag_index[key] = mapping.get('Tags', [])
+    return tag_index
+
+
+# --- Cheapest list call per category ---
+# Each lister yields (name, tags) using the same name the full collector
+# passes to get_environment_from_name, so both paths categorise alike.
+# Tags come inline where the list call returns them, otherwise from the
+# tagging-API index.
+
+def _list_security_groups(tag_index):
+    ec2_client = get_client('ec2')
+    for sg in paginate(ec2_client, 'describe_security_groups', 'SecurityGroups'):
+        yield sg.get('GroupName', sg['GroupId']), sg.get('Tags', [])
+
+
+def _list_instances(tag_index):
+    ec2_client = get_client('ec2')
+    filters = [{'Name': 'instance-state-name', 'Values': ['running', 'stopped']}]
+    for reservation in paginate(ec2_client, 'describe_instances', 'Reservations', Filters=filters):
+        for instance in reservation['Instances']:
+            yield _name_tag(instance.get('Tags'), instance['InstanceId']), instance.get('Tags', [])
+
+
+def _list_vpcs(tag_index):
+    ec2_client = get_client('ec2')
+    for vpc in paginate(ec2_client, 'describe_vpcs', 'Vpcs'):
+        yield _name_tag(vpc.get('Tags'), vpc['VpcId']), vpc.get('Tags', [])
+
+
+def _list_functions(tag_index):
+    lambda_client = get_client('lambda')
+    for function in paginate(lambda_client, 'list_functions', 'Functions'):
+        yield function['FunctionName'], tag_index.get(('lambda', function['FunctionName']))
+
+
+def _list_buckets(tag_index):
+    s3_client = get_client('s3')
+    for bucket in paginate(s3_client, 'list_buckets', 'Buckets'):
+        yield bucket['Name'], tag_index.get(('s3', bucket['Name']))
+
+
+def _list_apis(tag_index):
+    for api in paginate(get_client('apigatewayv2'), 'get_apis', 'Items'):
+        yield api['Name'], api.get('Tags', {})
+    for api in paginate(get_client('apigateway'), 'get_rest_apis', 'items'):
+        yield api['name'], api.get('tags', {})
+
+
+def _list_rds_instances(tag_index):
+    rds_client = get_client('rds')
+    for instance in paginate(rds_client, 'describe_db_instances', 'DBInstances'):
+        yield instance['DBInstanceIdentifier'], instance.get('TagList', [])
+
+
+def _list_user_pools(tag_index):
+    cognito_client = get_client('cognito-idp')
+    for pool in paginate(cognito_client, 'list_user_pools', 'UserPools', MaxResults=60):
+        yield pool['Name'], tag_index.get(('cognito-idp', pool['Id']))
+
+
+def _list_ecr_repositories(tag_index):
+    ecr_client = get_client('ecr')
+    for repo in paginate(ecr_client, 'describe_repositories', 'repositories'):
+        yield repo['repositoryName'], tag_index.get(('ecr', repo['repositoryName']))
+
+
+def _list_eks_clusters(tag_index):
+    eks_client = get_client('eks')
+    for name in paginate(eks_client, 'list_clusters', 'clusters'):
+        yield name, tag_index.get(('eks', name))
+
+
+def _list_ecs_clusters(tag_index):
+    ecs_client = get_client('ecs')
+    for cluster_arn in paginate(ecs_client, 'list_clusters', 'clusterArns'):
+        key = arn_key(cluster_arn)
+        yield key[1], tag_index.get(key)
+
+
+def _list_neptune_clusters(tag_index):
+    neptune_client = get_client('neptune')
+    for cluster in paginate(neptune_client, 'describe_db_clusters', 'DBClusters', Filters=NEPTUNE_ENGINE_FILTER):
+        yield cluster['DBClusterIdentifier'], cluster.get('TagList', [])
+
+
+def _list_dynamodb_tables(tag_index):
+    dynamodb_client = get_client('dynamodb')
+    for table_name in paginate(dynamodb_client, 'list_tables', 'TableNames'):
+        yield table_name, tag_index.get(('dynamodb', table_name))
+
+
+def _list_elasticache_clusters(tag_index):
+    elasticache_client = get_client('elasticache')
+    for group in paginate(elasticache_client, 'describe_replication_groups', 'ReplicationGroups'):
+        yield group['ReplicationGroupId'], tag_index.get(('elasticache', group['ReplicationGroupId']))
+    for cluster in paginate(elasticache_client, 'describe_cache_clusters', 'CacheClusters'):
+        if cluster['Engine'] == 'memcached':
+            yield cluster['CacheClusterId'], tag_index.get(('elasticache', cluster['CacheClusterId']))
+
+
+def _list_sqs_queues(tag_index):
+    sqs_client = get_client('sqs')
+    for queue_url in paginate(sqs_client, 'list_queues', 'QueueUrls'):
+        queue_name = queue_url.split('/')[-1]
+        yield queue_name, tag_index.get(('sqs', queue_name))
+
+
+def _list_kinesis_streams(tag_index):
+    kinesis_client = get_client('kinesis')
+    for stream_name in paginate(kinesis_client, 'list_streams', 'StreamNames'):
+        yield stream_name, tag_index.get(('kinesis', stream_name))
+
+
+def _list_firehose_streams(tag_index):
+    firehose_client = get_client('firehose')
+    last_stream_name = None
+    while True:
+        kwargs = {'ExclusiveStartDeliveryStreamName': last_stream_name} if last_stream_name else {}
+        response = firehose_client.list_delivery_streams(**kwargs)
+        for stream_name in response.get('DeliveryStreamNames', []):
+            last_stream_name = stream_name
+            yield stream_name, tag_index.get(('firehose', stream_name))
+        if not response.get('HasMoreDeliveryStreams') or not last_stream_name:
+            break
+
+
+def _list_iam_roles(tag_index):
+    # IAM is not covered by the tagging API and list_roles omits tags, so
+    # roles are judged on their name alone in the fast path.
+    for role in paginate(get_client('iam'), 'list_roles', 'Roles'):
+        yield role['RoleName'], role.get('Tags')
+
+
+def _list_iam_users(tag_index):
+    for user in paginate(get_client('iam'), 'list_users', 'Users'):
+        yield user['UserName'], user.get('Tags')
+
+
+def _list_sns_topics(tag_index):
+    sns_client = get_client('sns')
+    for topic in paginate(sns_client, 'list_topics', 'Topics'):
+        topic_name = topic['TopicArn'].split(':')[-1]
+        yield topic_name, tag_index.get(('sns', topic_name))
+
+
+def _list_event_buses(tag_index):
+    events_client = get_client('events')
+    for bus in paginate(events_client, 'list_event_buses', 'EventBuses'):
+        yield bus['Name'], tag_index.get(('events', bus['Name']))
+
+
+# Keyed by the same category names lambda_function.py's resource_map uses.
+INVENTORY_LISTERS = {
+    'instances': _list_instances,
+    'security_groups': _list_security_groups,
+    'functions': _list_functions,
+    's3_buckets': _list_buckets,
+    'api_gateways': _list_apis,
+    'vpcs': _list_vpcs,
+    'rds_instances': _list_rds_instances,
+    'user_pools': _list_user_pools,
+    'ecr_repositories': _list_ecr_repositories,
+    'eks_clusters': _list_eks_clusters,
+    'ecs_clusters': _list_ecs_clusters,
+    'neptune_clusters': _list_neptune_clusters,
+    'dynamodb_tables': _list_dynamodb_tables,
+    'elasticache_clusters': _list_elasticache_clusters,
+    'sqs_queues': _list_sqs_queues,
+    'kinesis_streams': _list_kinesis_streams,
+    'firehose_streams': _list_firehose_streams,
+    'iam_roles': _list_iam_roles,
+    'iam_users': _list_iam_users,
+    'sns_topics': _list_sns_topics,
+    'eventbridge_buses': _list_event_buses,
+}
+
+
+def get_inventory_data(categories=None, tag_index=None):
+    """
+    Enumerates every tracked resource with only names and tags - no
+    per-resource describes, policies, target health or subscriptions - and
+    categorises each one. Used by the fast dry run to validate environment
+    detection on a large account in seconds.
+    A category whose list call fails is skipped and reported, not fatal.
+    `categories` limits the sweep to the enabled collectors' categories.
+    `tag_index` is a get_tag_index() result the caller already has (the
+    environment scope's), so a scoped run sweeps the tagging API only once.
+    """
+    if tag_index is None:
+        try:
+            tag_index = get_tag_index()
+        except ClientError as e:
+            print(f"WARN: Resource Groups Tagging API unavailable ({e}); falling back to inline tags and names only.")
+            tag_index = {}
+
+    resources, failed = {}, []
+    for category, lister in INVENTORY_LISTERS.items():
+        if categories is not None and category not in categories:
+            continue
+        try:
+            resources[category] = [
+                {'Name': name, 'Environment': get_environment_from_name(name, tags)}
+                for name, tags in lister(tag_index)
+            ]
+        except ClientError as e:
+            print(f"WARN: could not list {category} for the inventory: {e}")
+            failed.append(category)
+
+    return {'resources': resources, 'failed': failed, 'tagged_resources': len(tag_index)}
@@ -1,5 +1,5 @@
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope
 
 def get_lambda_data():
     """
@@ -15,6 +15,8 @@ def get_lambda_data():
         paginator = lambda_client.get_paginator('list_functions')
         for page in paginator.paginate():
             for function in page['Functions']:
+                if not in_env_scope(function['FunctionName'], arn=function['FunctionArn']):
+                    continue
                 vpc_config = function.get('VpcConfig')
 
                 # list_functions does not return tags, so fetch them per function.
@@ -25,6 +27,7 @@ def get_lambda_data():
 
                 function_details = {
                     'Name': function['FunctionName'],
+                    'Arn': function['FunctionArn'],
                     'Runtime': function.get('Runtime', 'Container/Unknown'),
                     'Environment': get_environment_from_name(function['FunctionName'], tags),
                     'EnvironmentVariables': function.get('Environment', {}).get('Variables', {}),
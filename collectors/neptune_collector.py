@@ -1,6 +1,22 @@
 # collectors/neptune_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client
+from utils import get_environment_from_name, get_client, in_env_scope
+
+# Neptune shares the RDS API; without this filter Aurora/RDS clusters and
+# instances come back too.
+NEPTUNE_ENGINE_FILTER = [{'Name': 'engine', 'Values': ['neptune']}]
+
+
+def _instances_by_id(neptune_client):
+    """Every Neptune instance from one paginated call, keyed by identifier,
+    so the number of calls stays constant however large clusters grow."""
+    instances = {}
+    paginator = neptune_client.get_paginator('describe_db_instances')
+    for page in paginator.paginate(Filters=NEPTUNE_ENGINE_FILTER):
+        for instance in page['DBInstances']:
+            instances[instance['DBInstanceIdentifier']] = instance
+    return instances
+
 
 def get_neptune_data():
     """
@@ -10,20 +26,24 @@ def get_neptune_data():
     try:
         neptune_client = get_client('neptune')
         clusters_data = []
+        instances_index = None
         
         paginator = neptune_client.get_paginator('describe_db_clusters')
-        for page in paginator.paginate():
+        for page in paginator.paginate(Filters=NEPTUNE_ENGINE_FILTER):
             for cluster in page['DBClusters']:
                 cluster_id = cluster['DBClusterIdentifier']
+                if not in_env_scope(cluster_id, tags=cluster.get('TagList', [])):
+                    continue
                 
-                # Get instances within the cluster
+                # Join the cluster's members against the instance index,
+                # fetched once on the first cluster that has members.
                 instances_in_cluster = []
+                if cluster.get('DBClusterMembers') and instances_index is None:
+                    instances_index = _instances_by_id(neptune_client)
                 for member in cluster.get('DBClusterMembers', []):
                     instance_id = member['DBInstanceIdentifier']
-                    # Get full details for each instance
-                    instance_details_response = neptune_client.describe_db_instances(DBInstanceIdentifier=instance_id)
-                    if instance_details_response.get('DBInstances'):
-                        instance = instance_details_response['DBInstances'][0]
+                    instance = instances_index.get(instance_id)
+                    if instance:
                         endpoint = instance.get('Endpoint', {})
                         subnets = [s['SubnetIdentifier'] for s in instance.get('DBSubnetGroup', {}).get('Subnets', [])]
                         sgs = [sg['VpcSecurityGroupId'] for sg in instance.get('VpcSecurityGroups', [])]
@@ -1,6 +1,12 @@
 # collectors/queues_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope
+
+# Only the attributes the report renders; 'All' returns ~20 per queue.
+SQS_QUEUE_ATTRIBUTES = ['ApproximateNumberOfMessages', 'FifoQueue', 'QueueArn']
+# Only the first destination is rendered.
+FIREHOSE_DESTINATION_LIMIT = 1
+
 
 def get_queues_data():
     """
@@ -21,7 +27,9 @@ def get_queues_data():
         for page in paginator_sqs.paginate():
             for queue_url in page.get('QueueUrls', []):
                 queue_name = queue_url.split('/')[-1]
-                attrs = sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=['All']).get('Attributes', {})
+                if not in_env_scope(queue_name, key=('sqs', queue_name)):
+                    continue
+                attrs = sqs_client.get_queue_attributes(QueueUrl=queue_url, AttributeNames=SQS_QUEUE_ATTRIBUTES).get('Attributes', {})
                 tags = safe_tags(
                     lambda url=queue_url: sqs_client.list_queue_tags(QueueUrl=url).get('Tags', {}),
                     f"SQS queue {queue_name}"
@@ -29,8 +37,9 @@ def get_queues_data():
 
                 sqs_queues.append({
                     'Name': queue_name,
-                    'Type': 'Standard' if 'FifoQueue' not in attrs else 'FIFO',
+                    'Type': 'FIFO' if attrs.get('FifoQueue') == 'true' else 'Standard',
                     'MessageCount': attrs.get('ApproximateNumberOfMessages', 'N/A'),
+                    'Arn': attrs.get('QueueArn'),
                     'Environment': get_environment_from_name(queue_name, tags)
                 })
         
@@ -38,7 +47,10 @@ def get_queues_data():
         paginator_kinesis = kinesis_client.get_paginator('list_streams')
         for page in paginator_kinesis.paginate():
             for stream_name in page.get('StreamNames', []):
-                details = kinesis_client.describe_stream(StreamName=stream_name).get('StreamDescription', {})
+                if not in_env_scope(stream_name, key=('kinesis', stream_name)):
+                    continue
+                # The summary carries OpenShardCount without paging the shard list.
+                details = kinesis_client.describe_stream_summary(StreamName=stream_name).get('StreamDescriptionSummary', {})
                 tags = safe_tags(
                     lambda n=stream_name: kinesis_client.list_tags_for_stream(StreamName=n).get('Tags', []),
                     f"Kinesis stream {stream_name}"
@@ -47,7 +59,8 @@ def get_queues_data():
                 kinesis_streams.append({
                     'Name': stream_name,
                     'Status': details.get('StreamStatus'),
-                    'Shards': len(details.get('Shards', [])),
+                    'Shards': details.get('OpenShardCount', 0),
+                    'Arn': details.get('StreamARN'),
                     'Environment': get_environment_from_name(stream_name, tags)
                 })
 
@@ -67,7 +80,11 @@ def get_queues_data():
                 last_stream_name = all_stream_names[-1]
 
         for stream_name in all_stream_names:
-            details = firehose_client.describe_delivery_stream(DeliveryStreamName=stream_name).get('DeliveryStreamDescription', {})
+            if not in_env_scope(stream_name, key=('firehose', stream_name)):
+                continue
+            details = firehose_client.describe_delivery_stream(
+                DeliveryStreamName=stream_name, Limit=FIREHOSE_DESTINATION_LIMIT
+            ).get('DeliveryStreamDescription', {})
             destination_type = 'N/A'
             if details.get('Destinations'):
                 dest_keys = [key for key in details['Destinations'][0] if 'DestinationDescription' in key]
@@ -82,6 +99,7 @@ def get_queues_data():
                 'Name': stream_name,
                 'Status': details.get('DeliveryStreamStatus'),
                 'Destination': destination_type,
+                'Arn': details.get('DeliveryStreamARN'),
                 'Environment': get_environment_from_name(stream_name, fh_tags)
             })
 
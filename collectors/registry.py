@@ -0,0 +1,221 @@
+# collectors/registry.py
+import os
+import json
+import importlib
+
+HOUR, DAY, WEEK = 3600, 86400, 7 * 86400
+
+# One entry per collector, in run order. lambda_function.py derives the
+# collector list, the failure fallbacks and the resource_map from this table.
+#   module / function: imported lazily, only when the collector is enabled
+#   fallback:          well-formed empty result used when it fails or is disabled
+#   outputs:           resource_map category -> key in the collector's result
+#   iam_actions:       read actions the collector needs
+#   max_age:           seconds a stored result stays usable before the collector re-runs
+#   aliases:           other names accepted by ENABLED_COLLECTORS / {"services": [...]}
+COLLECTORS = {
+    'ec2': {
+        'module': 'collectors.ec2_collector', 'function': 'get_ec2_data',
+        'fallback': {'instances': [], 'security_groups': [], 'subnet_map': {}, 'sg_map': {}, 'network_interfaces': []},
+        'outputs': {'instances': 'instances', 'security_groups': 'security_groups'},
+        'iam_actions': ['ec2:DescribeInstances', 'ec2:DescribeSecurityGroups', 'ec2:DescribeSubnets',
+                        'ec2:DescribeNetworkInterfaces'],
+        'max_age': HOUR,
+        'aliases': ['instances', 'security_groups', 'sg'],
+    },
+    'lambda': {
+        'module': 'collectors.lambda_collector', 'function': 'get_lambda_data',
+        'fallback': {'functions': [], 'event_source_mappings': []},
+        'outputs': {'functions': 'functions'},
+        'iam_actions': ['lambda:ListFunctions', 'lambda:ListTags', 'lambda:ListEventSourceMappings'],
+        'max_age': HOUR,
+        'aliases': ['functions'],
+    },
+    's3': {
+        'module': 'collectors.s3_collector', 'function': 'get_s3_data',
+        'fallback': {'buckets': []},
+        'outputs': {'s3_buckets': 'buckets'},
+        'iam_actions': ['s3:ListAllMyBuckets', 's3:GetBucketLocation', 's3:GetBucketTagging'],
+        'max_age': DAY,
+        'aliases': ['buckets'],
+    },
+    'apigateway': {
+        'module': 'collectors.apigateway_collector', 'function': 'get_apigateway_data',
+        'fallback': {'apis': []},
+        'outputs': {'api_gateways': 'apis'},
+        'iam_actions': ['apigateway:GET'],
+        'max_age': DAY,
+        'aliases': ['apigw', 'api'],
+    },
+    'vpc': {
+        'module': 'collectors.vpc_collector', 'function': 'get_vpc_data',
+        'fallback': {'vpcs': []},
+        'outputs': {'vpcs': 'vpcs'},
+        'iam_actions': ['ec2:DescribeVpcs', 'ec2:DescribeSubnets', 'ec2:DescribeRouteTables',
+                        'elasticloadbalancing:DescribeLoadBalancers', 'elasticloadbalancing:DescribeListeners',
+                        'elasticloadbalancing:DescribeTargetGroups', 'elasticloadbalancing:DescribeTargetHealth'],
+        'max_age': WEEK,
+        'aliases': ['elb', 'alb', 'elbv2', 'load_balancers'],
+    },
+    'rds': {
+        'module': 'collectors.rds_collector', 'function': 'get_rds_data',
+        'fallback': {'instances': []},
+        'outputs': {'rds_instances': 'instances'},
+        'iam_actions': ['rds:DescribeDBInstances'],
+        'max_age': DAY,
+        'aliases': [],
+    },
+    'cognito': {
+        'module': 'collectors.cognito_collector', 'function': 'get_cognito_data',
+        'fallback': {'user_pools': []},
+        'outputs': {'user_pools': 'user_pools'},
+        'iam_actions': ['cognito-idp:ListUserPools', 'cognito-idp:ListUserPoolClients', 'cognito-idp:DescribeUserPool'],
+        'max_age': WEEK,
+        'aliases': ['cognito-idp', 'user_pools'],
+    },
+    'container': {
+        'module': 'collectors.ecs_collector', 'function': 'get_container_data',
+        'fallback': {'ecr_repositories': [], 'eks_clusters': [], 'ecs_clusters': []},
+        'outputs': {'ecr_repositories': 'ecr_repositories', 'eks_clusters': 'eks_clusters', 'ecs_clusters': 'ecs_clusters'},
+        'iam_actions': ['ecr:DescribeRepositories', 'ecr:ListTagsForResource', 'eks:ListClusters', 'eks:DescribeCluster',
+                        'ecs:ListClusters', 'ecs:DescribeClusters', 'ecs:ListServices', 'ecs:DescribeServices',
+                        'ecs:DescribeTaskDefinition'],
+        'max_age': HOUR,
+        'aliases': ['ecs', 'eks', 'ecr', 'containers'],
+    },
+    'neptune': {
+        'module': 'collectors.neptune_collector', 'function': 'get_neptune_data',
+        'fallback': {'clusters': []},
+        'outputs': {'neptune_clusters': 'clusters'},
+        'iam_actions': ['rds:DescribeDBClusters', 'rds:DescribeDBInstances'],
+        'max_age': DAY,
+        'aliases': [],
+    },
+    'dynamodb': {
+        'module': 'collectors.dynamodb_collector', 'function': 'get_dynamodb_data',
+        'fallback': {'tables': []},
+        'outputs': {'dynamodb_tables': 'tables'},
+        'iam_actions': ['dynamodb:ListTables', 'dynamodb:DescribeTable', 'dynamodb:ListTagsOfResource'],
+        'max_age': DAY,
+        'aliases': ['dynamo'],
+    },
+    'elasticache': {
+        'module': 'collectors.elasticache_collector', 'function': 'get_elasticache_data',
+        'fallback': {'clusters': []},
+        'outputs': {'elasticache_clusters': 'clusters'},
+        'iam_actions': ['elasticache:DescribeReplicationGroups', 'elasticache:DescribeCacheClusters',
+                        'elasticache:ListTagsForResource'],
+        'max_age': DAY,
+        'aliases': ['redis', 'memcached'],
+    },
+    'queues': {
+        'module': 'collectors.queues_collector', 'function': 'get_queues_data',
+        'fallback': {'sqs_queues': [], 'kinesis_streams': [], 'firehose_streams': []},
+        'outputs': {'sqs_queues': 'sqs_queues', 'kinesis_streams': 'kinesis_streams', 'firehose_streams': 'firehose_streams'},
+        'iam_actions': ['sqs:ListQueues', 'sqs:GetQueueAttributes', 'sqs:ListQueueTags',
+                        'kinesis:ListStreams', 'kinesis:DescribeStreamSummary', 'kinesis:ListTagsForStream',
+                        'firehose:ListDeliveryStreams', 'firehose:DescribeDeliveryStream',
+                        'firehose:ListTagsForDeliveryStream'],
+        'max_age': HOUR,
+        'aliases': ['sqs', 'kinesis', 'firehose'],
+    },
+    'iam': {
+        'module': 'collectors.iam_collector', 'function': 'get_iam_data',
+        'fallback': {'roles': [], 'users': []},
+        'outputs': {'iam_roles': 'roles', 'iam_users': 'users'},
+        'iam_actions': ['iam:ListRoles', 'iam:ListRoleTags', 'iam:ListAttachedRolePolicies', 'iam:ListRolePolicies',
+                        'iam:GetRolePolicy', 'iam:GetPolicy', 'iam:GetPolicyVersion', 'iam:ListUsers',
+                        'iam:ListUserTags', 'iam:ListMFADevices', 'iam:ListAccessKeys',
+                        'iam:ListAttachedUserPolicies'],
+        'max_age': WEEK,
+        'aliases': [],
+    },
+    'sns': {
+        'module': 'collectors.sns_collector', 'function': 'get_sns_data',
+        'fallback': {'topics': []},
+        'outputs': {'sns_topics': 'topics'},
+        'iam_actions': ['sns:ListTopics', 'sns:ListSubscriptions', 'sns:ListTagsForResource'],
+        'max_age': DAY,
+        'aliases': [],
+    },
+    'eventbridge': {
+        'module': 'collectors.eventbridge_collector', 'function': 'get_eventbridge_data',
+        'fallback': {'event_buses': []},
+        'outputs': {'eventbridge_buses': 'event_buses'},
+        'iam_actions': ['events:ListEventBuses', 'events:ListRules', 'events:ListTargetsByRule',
+                        'events:ListTagsForResource'],
+        'max_age': DAY,
+        'aliases': ['events'],
+    },
+}
+
+_ALIASES = {alias: name for name, spec in COLLECTORS.items() for alias in [name] + spec['aliases']}
+
+
+def resolve_collectors(requested=None):
+    """
+    Maps requested service names (collector names or aliases, e.g. "sqs" for
+    the queues collector) onto collector names, in registry order. None or
+    an empty request enables every collector; unknown names are warned about
+    and ignored.
+    """
+    if not requested:
+        return list(COLLECTORS)
+    if isinstance(requested, str):
+        requested = requested.split(',')
+    wanted = set()
+    for service in requested:
+        service = service.strip().lower()
+        if not service:
+            continue
+        if service in _ALIASES:
+            wanted.add(_ALIASES[service])
+        else:
+            print(f"WARN: unknown collector '{service}' ignored. Known: {', '.join(COLLECTORS)}.")
+    if not wanted:
+        print("WARN: no known collectors requested; running all of them.")
+        return list(COLLECTORS)
+    return [name for name in COLLECTORS if name in wanted]
+
+
+def load_collector(name):
+    """Returns a callable that imports the collector's module on first use
+    and runs it, so disabled collectors cost no import time."""
+    spec = COLLECTORS[name]
+
+    def collect():
+        module = importlib.import_module(spec['module'])
+        return getattr(module, spec['function'])()
+    return collect
+
+
+def fallback_for(name):
+    """A fresh copy of the collector's empty result."""
+    return {key: type(value)() for key, value in COLLECTORS[name]['fallback'].items()}
+
+
+def enabled_categories(names):
+    """The resource_map categories produced by the given collectors."""
+    return [category for name in names for category in COLLECTORS[name]['outputs']]
+
+
+def required_iam_actions(names):
+    """Sorted read actions needed by the given collectors."""
+    return sorted({action for name in names for action in COLLECTORS[name]['iam_actions']})
+
+
+def _load_max_ages():
+    """Per-collector max ages, with COLLECTOR_MAX_AGES (JSON of seconds,
+    e.g. {"iam": 86400}) overriding the registry defaults. 0 always re-runs."""
+    ages = {name: spec['max_age'] for name, spec in COLLECTORS.items()}
+    raw = os.environ.get('COLLECTOR_MAX_AGES')
+    if raw:
+        try:
+            overrides = {_ALIASES.get(str(k).lower(), k): int(v) for k, v in json.loads(raw).items()}
+            ages.update({k: v for k, v in overrides.items() if k in COLLECTORS})
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"WARN: ignoring invalid COLLECTOR_MAX_AGES ({e}); using defaults.")
+    return ages
+
+
+COLLECTOR_MAX_AGES = _load_max_ages()
@@ -1,6 +1,60 @@
 # collectors/s3_collector.py
+import threading
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client
+from utils import get_environment_from_name, get_client, in_env_scope, parallel_map, paginate
+
+# Bucket regions never change, so they are remembered for the life of the container.
+_BUCKET_REGIONS = {}
+_BUCKET_REGIONS_LOCK = threading.Lock()
+
+
+def _bucket_region(s3_client, bucket):
+    """The bucket's region: from list_buckets' BucketRegion when present,
+    otherwise one get_bucket_location per bucket per container. None (use the
+    default client) if it cannot be resolved."""
+    bucket_name = bucket['Name']
+    if bucket.get('BucketRegion'):
+        return bucket['BucketRegion']
+    with _BUCKET_REGIONS_LOCK:
+        if bucket_name in _BUCKET_REGIONS:
+            return _BUCKET_REGIONS[bucket_name]
+    try:
+        # This API call requires s3:GetBucketLocation permission
+        location = s3_client.get_bucket_location(Bucket=bucket_name).get('LocationConstraint')
+        # us-east-1 reports no constraint; "EU" is the legacy name of eu-west-1.
+        region = {None: 'us-east-1', '': 'us-east-1', 'EU': 'eu-west-1'}.get(location, location)
+    except ClientError as e:
+        print(f"WARN: could not resolve the region of bucket {bucket_name}, using the default client: {e}")
+        return None
+    with _BUCKET_REGIONS_LOCK:
+        _BUCKET_REGIONS[bucket_name] = region
+    return region
+
+
+def _scope_key(s3_client, bucket):
+    """The bucket's tag-index key, or None when its tags are unknown. The
+    tagging API behind the scope's index is regional, so buckets in other
+    (or unlisted) regions are missing from it whatever their tags are."""
+    if bucket.get('BucketRegion') == s3_client.meta.region_name:
+        return ('s3', bucket['Name'])
+    return None
+
+
+def _bucket_tags(s3_client, bucket):
+    bucket_name = bucket['Name']
+    region = _bucket_region(s3_client, bucket)
+    # Calling a bucket's own region avoids a redirect round trip per request.
+    regional_client = get_client('s3', region_name=region) if region else s3_client
+    try:
+        # This API call requires s3:GetBucketTagging permission
+        return regional_client.get_bucket_tagging(Bucket=bucket_name).get('TagSet', [])
+    except ClientError as e:
+        # A "NoSuchTagSet" error is normal for buckets without tags, so we ignore it.
+        # We only care if we are denied permission completely.
+        if 'NoSuchTagSet' not in str(e) and 'AccessDenied' not in str(e):
+            print(f"Could not get tags for bucket {bucket_name}: {e}")
+        return []
+
 
 def get_s3_data():
     """
@@ -9,27 +63,17 @@ def get_s3_data():
     """
     try:
         s3_client = get_client('s3')
-        buckets_data = []
         
         # This API call requires s3:ListAllMyBuckets permission
-        response = s3_client.list_buckets()
-        
-        for bucket in response['Buckets']:
-            bucket_name = bucket['Name']
-            tags = []
-            try:
-                # This API call requires s3:GetBucketTagging permission
-                tag_response = s3_client.get_bucket_tagging(Bucket=bucket_name)
-                tags = tag_response.get('TagSet', [])
-            except ClientError as e:
-                # A "NoSuchTagSet" error is normal for buckets without tags, so we ignore it.
-                # We only care if we are denied permission completely.
-                if 'NoSuchTagSet' not in str(e) and 'AccessDenied' not in str(e):
-                    print(f"Could not get tags for bucket {bucket_name}: {e}")
-            
+        buckets = [bucket for bucket in paginate(s3_client, 'list_buckets', 'Buckets')
+                   if in_env_scope(bucket['Name'], key=_scope_key(s3_client, bucket))]
+        tags_by_bucket = parallel_map(lambda bucket: _bucket_tags(s3_client, bucket), buckets)
+
+        buckets_data = []
+        for bucket, tags in zip(buckets, tags_by_bucket):
             buckets_data.append({
-                'Name': bucket_name,
-                'Environment': get_environment_from_name(bucket_name, tags)
+                'Name': bucket['Name'],
+                'Environment': get_environment_from_name(bucket['Name'], tags)
             })
             
         return {'buckets': buckets_data}
@@ -39,4 +83,4 @@ def get_s3_data():
             return {'error': '(NO IAM ACCESS)', 'buckets': []}
         else:
             print(f"An unexpected Boto3 error occurred in get_s3_data: {e}")
-            raise e
\ No newline at end of file
+            raise e
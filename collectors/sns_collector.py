@@ -1,49 +1,108 @@
 # collectors/sns_collector.py
+import os
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client, safe_tags
+from utils import get_environment_from_name, get_client, safe_tags, in_env_scope, parallel_map
+
+# Topics fanning out to thousands of endpoints keep full detail only up to
+# this many subscriptions; beyond it just per-protocol counts and a few
+# sample endpoints are kept, bounding both memory and report size.
+SNS_SUBSCRIPTION_DETAIL_LIMIT = int(os.environ.get('SNS_SUBSCRIPTION_DETAIL_LIMIT', '50'))
+SNS_SUBSCRIPTION_SAMPLE_SIZE = 5
+
+
+class _TopicSubscriptions:
+    """Subscriptions of one topic, collapsing to a summary past the limit."""
+
+    def __init__(self):
+        self.details = []
+        self.total = 0
+        self.confirmed = 0
+        self.protocol_counts = None
+        self.sample = None
+
+    def add(self, sub):
+        self.total += 1
+        if sub['SubscriptionArn'].startswith('arn:'):
+            self.confirmed += 1
+        if self.protocol_counts is None and self.total > SNS_SUBSCRIPTION_DETAIL_LIMIT:
+            self.protocol_counts = {}
+            for kept in self.details:
+                self.protocol_counts[kept['Protocol']] = self.protocol_counts.get(kept['Protocol'], 0) + 1
+            self.sample = [kept['Endpoint'] for kept in self.details[:SNS_SUBSCRIPTION_SAMPLE_SIZE]]
+            self.details = []
+        if self.protocol_counts is None:
+            self.details.append(sub)
+        else:
+            self.protocol_counts[sub['Protocol']] = self.protocol_counts.get(sub['Protocol'], 0) + 1
+
+
+def _subscriptions_by_topic(sns_client, topic_arns):
+    """One account-wide list_subscriptions sweep, grouped by TopicArn, so
+    the cost grows with the number of subscriptions rather than topics.
+    Subscriptions of topics outside `topic_arns` are not kept."""
+    index = {arn: _TopicSubscriptions() for arn in topic_arns}
+    paginator_subs = sns_client.get_paginator('list_subscriptions')
+    for page in paginator_subs.paginate():
+        for sub in page.get('Subscriptions', []):
+            topic = index.get(sub.get('TopicArn'))
+            if topic is not None:
+                topic.add({
+                    'Protocol': sub.get('Protocol', 'N/A'),
+                    'Endpoint': sub.get('Endpoint', 'N/A'),
+                    'SubscriptionArn': sub.get('SubscriptionArn', 'N/A')
+                })
+    return index
 
 
 def get_sns_data():
     """
     Fetches detailed information about SNS topics and their subscriptions.
+    Subscriptions come from a single account-wide sweep and tags are fetched
+    concurrently; get_topic_attributes is not called, as none of its fields
+    are rendered (the confirmed count is derived from the sweep).
     Includes error handling for missing IAM permissions.
     """
     try:
         sns_client = get_client('sns')
         topics_data = []
 
+        topic_arns = []
         paginator_topics = sns_client.get_paginator('list_topics')
         for page in paginator_topics.paginate():
             for topic in page.get('Topics', []):
                 topic_arn = topic['TopicArn']
-                topic_name = topic_arn.split(':')[-1]
-
-                attrs = sns_client.get_topic_attributes(TopicArn=topic_arn).get('Attributes', {})
-
-                subscriptions = []
-                paginator_subs = sns_client.get_paginator('list_subscriptions_by_topic')
-                for sub_page in paginator_subs.paginate(TopicArn=topic_arn):
-                    for sub in sub_page.get('Subscriptions', []):
-                        subscriptions.append({
-                            'Protocol': sub.get('Protocol', 'N/A'),
-                            'Endpoint': sub.get('Endpoint', 'N/A'),
-                            'SubscriptionArn': sub.get('SubscriptionArn', 'N/A')
-                        })
-
-                tags = safe_tags(
-                    lambda arn=topic_arn: sns_client.list_tags_for_resource(ResourceArn=arn).get('Tags', []),
-                    f"SNS topic {topic_name}"
-                )
-
-                topics_data.append({
-                    'Name': topic_name,
-                    'TopicArn': topic_arn,
-                    'DisplayName': attrs.get('DisplayName', ''),
-                    'IsFifo': topic_name.endswith('.fifo'),
-                    'SubscriptionsConfirmed': attrs.get('SubscriptionsConfirmed', 'N/A'),
-                    'Subscriptions': subscriptions,
-                    'Environment': get_environment_from_name(topic_name, tags)
-                })
+                if in_env_scope(topic_arn.split(':')[-1], arn=topic_arn):
+                    topic_arns.append(topic_arn)
+
+        subscriptions_index = _subscriptions_by_topic(sns_client, topic_arns) if topic_arns else {}
+
+        all_tags = parallel_map(
+            lambda arn: safe_tags(
+                lambda: sns_client.list_tags_for_resource(ResourceArn=arn).get('Tags', []),
+                f"SNS topic {arn.split(':')[-1]}"
+            ),
+            topic_arns
+        )
+
+        for topic_arn, tags in zip(topic_arns, all_tags):
+            topic_name = topic_arn.split(':')[-1]
+            subscriptions = subscriptions_index[topic_arn]
+
+            topics_data.append({
+                'Name': topic_name,
+                'TopicArn': topic_arn,
+                'IsFifo': topic_name.endswith('.fifo'),
+                'SubscriptionsConfirmed': str(subscriptions.confirmed),
+                'SubscriptionCount': subscriptions.total,
+                # Full detail up to the limit; above it, Subscriptions is empty
+                # and SubscriptionSummary holds protocol counts and a sample.
+                'Subscriptions': subscriptions.details,
+                'SubscriptionSummary': {
+                    'ProtocolCounts': subscriptions.protocol_counts,
+                    'SampleEndpoints': subscriptions.sample,
+                } if subscriptions.protocol_counts is not None else None,
+                'Environment': get_environment_from_name(topic_name, tags)
+            })
 
         return {'topics': topics_data}
     except ClientError as e:
@@ -1,6 +1,22 @@
 # collectors/vpc_collector.py
 from botocore.exceptions import ClientError
-from utils import get_environment_from_name, get_client
+from utils import get_environment_from_name, get_client, in_env_scope, parallel_map, paginate
+
+
+def _forward_target_groups(listener):
+    """Target group ARNs of the listener's default forward actions."""
+    return [action['TargetGroupArn'] for action in listener.get('DefaultActions', [])
+            if action['Type'] == 'forward' and 'TargetGroupArn' in action]
+
+
+def _target_health(elbv2_client, tg_arn):
+    health_response = elbv2_client.describe_target_health(TargetGroupArn=tg_arn)
+    return [{
+        'Id': target_health['Target']['Id'],
+        'Port': target_health['Target'].get('Port'),
+        'Health': target_health['TargetHealth']['State']
+    } for target_health in health_response.get('TargetHealthDescriptions', [])]
+
 
 def get_vpc_data():
     """
@@ -12,10 +28,10 @@ def get_vpc_data():
         elbv2_client = get_client('elbv2')
         
         vpcs_data = {}
+        scoped_vpc_ids = set()
 
         # Requires ec2:DescribeVpcs
-        vpcs_response = ec2_client.describe_vpcs()
-        for vpc in vpcs_response.get('Vpcs', []):
+        for vpc in paginate(ec2_client, 'describe_vpcs', 'Vpcs'):
             vpc_id = vpc['VpcId']
             name = next((tag['Value'] for tag in vpc.get('Tags', []) if tag['Key'] == 'Name'), vpc_id)
             vpcs_data[vpc_id] = {
@@ -23,10 +39,11 @@ def get_vpc_data():
                 'Environment': get_environment_from_name(name, vpc.get('Tags', [])),
                 'Subnets': [], 'RouteTables': [], 'LoadBalancers': []
             }
+            if in_env_scope(name, tags=vpc.get('Tags', [])):
+                scoped_vpc_ids.add(vpc_id)
 
         # Requires ec2:DescribeSubnets
-        subnets_response = ec2_client.describe_subnets()
-        for subnet in subnets_response.get('Subnets', []):
+        for subnet in paginate(ec2_client, 'describe_subnets', 'Subnets'):
             if subnet['VpcId'] in vpcs_data:
                 vpcs_data[subnet['VpcId']]['Subnets'].append({
                     'SubnetId': subnet['SubnetId'], 'CidrBlock': subnet['CidrBlock'],
@@ -34,8 +51,7 @@ def get_vpc_data():
                 })
 
         # Requires ec2:DescribeRouteTables
-        routes_response = ec2_client.describe_route_tables()
-        for table in routes_response.get('RouteTables', []):
+        for table in paginate(ec2_client, 'describe_route_tables', 'RouteTables'):
             if table['VpcId'] in vpcs_data:
                 routes = [{'Destination': r.get('DestinationCidrBlock', 'N/A'),
                            'Target': r.get('GatewayId') or r.get('TransitGatewayId') or r.get('NatGatewayId') or 'N/A'}
@@ -45,43 +61,47 @@ def get_vpc_data():
                 })
 
         # Requires elasticloadbalancing:* permissions
-        lbs_response = elbv2_client.describe_load_balancers()
-        for lb in lbs_response.get('LoadBalancers', []):
-            if lb['VpcId'] in vpcs_data:
-                lb_arn = lb['LoadBalancerArn']
-                
-                listeners_response = elbv2_client.describe_listeners(LoadBalancerArn=lb_arn)
-                listeners_details = []
-                for listener in listeners_response.get('Listeners', []):
-                    target_groups = []
-                    for action in listener.get('DefaultActions', []):
-                        if action['Type'] == 'forward' and 'TargetGroupArn' in action:
-                            tg_arn = action['TargetGroupArn']
-                            tg_response = elbv2_client.describe_target_groups(TargetGroupArns=[tg_arn])
-                            tg_name = tg_response['TargetGroups'][0]['TargetGroupName'] if tg_response['TargetGroups'] else 'N/A'
-                            
-                            targets = []
-                            health_response = elbv2_client.describe_target_health(TargetGroupArn=tg_arn)
-                            for target_health in health_response.get('TargetHealthDescriptions', []):
-                                targets.append({
-                                    'Id': target_health['Target']['Id'],
-                                    'Port': target_health['Target'].get('Port'),
-                                    'Health': target_health['TargetHealth']['State']
-                                })
-                            target_groups.append({'Name': tg_name, 'Targets': targets})
+        # Load balancers are rendered under their VPC; only describe listeners
+        # and target health for those in a scoped VPC or whose own name or
+        # tags place them in scope (e.g. a prod ALB in a shared VPC).
+        load_balancers = [lb for lb in paginate(elbv2_client, 'describe_load_balancers', 'LoadBalancers')
+                          if lb['VpcId'] in vpcs_data and (
+                              lb['VpcId'] in scoped_vpc_ids
+                              or in_env_scope(lb['LoadBalancerName'], arn=lb['LoadBalancerArn']))]
+        listeners_by_lb = parallel_map(
+            lambda lb: list(paginate(elbv2_client, 'describe_listeners', 'Listeners',
+                                      LoadBalancerArn=lb['LoadBalancerArn'])),
+            load_balancers
+        )
 
-                    listeners_details.append({
-                        'Port': listener['Port'], 'Protocol': listener['Protocol'],
-                        'TargetGroups': target_groups
-                    })
+        # Listeners routinely share target groups, so each group is looked
+        # up once: names from a single paginated sweep, health per group.
+        tg_arns = list(dict.fromkeys(
+            arn for listeners in listeners_by_lb for listener in listeners for arn in _forward_target_groups(listener)
+        ))
+        tg_names = {}
+        if tg_arns:
+            tg_names = {tg['TargetGroupArn']: tg['TargetGroupName']
+                        for tg in paginate(elbv2_client, 'describe_target_groups', 'TargetGroups')}
+        tg_targets = dict(zip(tg_arns, parallel_map(lambda arn: _target_health(elbv2_client, arn), tg_arns)))
 
-                vpcs_data[lb['VpcId']]['LoadBalancers'].append({
-                    'Name': lb['LoadBalancerName'],
-                    'DNSName': lb['DNSName'],
-                    'Type': lb['Type'],
-                    'SecurityGroupIds': lb.get('SecurityGroups', []),
-                    'Listeners': listeners_details
+        for lb, listeners in zip(load_balancers, listeners_by_lb):
+            listeners_details = []
+            for listener in listeners:
+                target_groups = [{'Name': tg_names.get(tg_arn, 'N/A'), 'Targets': tg_targets[tg_arn]}
+                                 for tg_arn in _forward_target_groups(listener)]
+                listeners_details.append({
+                    'Port': listener['Port'], 'Protocol': listener['Protocol'],
+                    'TargetGroups': target_groups
                 })
+
+            vpcs_data[lb['VpcId']]['LoadBalancers'].append({
+                'Name': lb['LoadBalancerName'],
+                'DNSName': lb['DNSName'],
+                'Type': lb['Type'],
+                'SecurityGroupIds': lb.get('SecurityGroups', []),
+                'Listeners': listeners_details
+            })
                 
         return {'vpcs': list(vpcs_data.values())}
     except ClientError as e:
@@ -2,34 +2,30 @@
 import os
 import json
 import traceback
-from datetime import datetime
-
-from utils import get_client
-
-# Import all our custom functions from the new modules
-from collectors.ec2_collector import get_ec2_data
-from collectors.lambda_collector import get_lambda_data
-from collectors.s3_collector import get_s3_data
-from collectors.apigateway_collector import get_apigateway_data
-from collectors.vpc_collector import get_vpc_data
-from collectors.rds_collector import get_rds_data
-from collectors.cognito_collector import get_cognito_data
-from collectors.ecs_collector import get_container_data
-from collectors.neptune_collector import get_neptune_data
-from collectors.dynamodb_collector import get_dynamodb_data
-from collectors.elasticache_collector import get_elasticache_data
-from collectors.queues_collector import get_queues_data
-from collectors.iam_collector import get_iam_data
-from collectors.sns_collector import get_sns_data
-from collectors.eventbridge_collector import get_eventbridge_data
+from datetime import datetime, timezone
+
+from utils import get_client, start_env_audit, current_env_audit, start_env_scope, warm_clients, WARM_CLIENTS, ENV_ALIASES
+from response_cache import start_response_cache
+from snapshots import start_snapshot_store
+
+from collectors.registry import (
+    COLLECTORS, COLLECTOR_MAX_AGES, resolve_collectors, load_collector, fallback_for, enabled_categories, required_iam_actions,
+)
 from reporting.markdown_report import generate_text_report
-from reporting.mermaid_diagram import generate_mermaid_diagram
+from reporting.mermaid_diagram import generate_mermaid_diagrams
+from analysis.reference_matcher import build_reference_matcher, find_lambda_references
+from analysis.resource_graph import build_resource_graph
+from analysis.sg_connectivity import build_sg_connectivity
 
 # Environment variable for the S3 bucket
 S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
 if not S3_BUCKET_NAME:
     raise ValueError("S3_BUCKET_NAME environment variable not set.")
 
+# Init-phase warm-up: runs once per container, before the first invocation.
+if WARM_CLIENTS:
+    warm_clients(WARM_CLIENTS)
+
 def upload_to_s3(content, bucket, object_name):
     """Uploads a string content to an S3 object."""
     s3_client = get_client('s3')
@@ -40,26 +36,15 @@ def upload_to_s3(content, bucket, object_name):
         print(f"Error uploading file: {e}")
         raise e
 
-    # Fallback shape returned for a collector that fails, keyed by the same
-    # dict keys lambda_function.py/reporting modules expect to find populated
-    # (as empty lists) so downstream code never KeyErrors on a missing field.
-COLLECTOR_FALLBACKS = {
-    'ec2': {'instances': [], 'security_groups': [], 'subnet_map': {}, 'sg_map': {}},
-    'lambda': {'functions': [], 'event_source_mappings': []},
-    's3': {'buckets': []},
-    'apigateway': {'apis': []},
-    'vpc': {'vpcs': []},
-    'rds': {'instances': []},
-    'cognito': {'user_pools': []},
-    'container': {'ecr_repositories': [], 'eks_clusters': [], 'ecs_clusters': []},
-    'neptune': {'clusters': []},
-    'dynamodb': {'tables': []},
-    'elasticache': {'clusters': []},
-    'queues': {'sqs_queues': [], 'kinesis_streams': [], 'firehose_streams': []},
-    'iam': {'roles': [], 'users': []},
-    'sns': {'topics': []},
-    'eventbridge': {'event_buses': []},
-}
+# Environment variable listing the collectors to run (names or aliases such
+# as "lambda,sqs"); unset runs all of them. {"services": [...]} overrides it.
+ENABLED_COLLECTORS = os.environ.get('ENABLED_COLLECTORS', '')
+
+# Fallback shape returned for a collector that fails, keyed by the same
+# dict keys lambda_function.py/reporting modules expect to find populated
+# (as empty lists) so downstream code never KeyErrors on a missing field.
+COLLECTOR_FALLBACKS = {name: spec['fallback'] for name, spec in COLLECTORS.items()}
+COLLECTOR_FALLBACKS['inventory'] = {'resources': {}, 'failed': [], 'tagged_resources': 0}
 
 
 def safe_collect(collector_name, collector_func):
@@ -67,7 +52,7 @@ def safe_collect(collector_name, collector_func):
     Runs a single collector in isolation. If it raises ANYTHING (throttling
     that outlasts the retry budget, an unexpected ClientError, a bug in the
     collector itself, etc.), the failure is logged and a well-formed empty
-    result is returned instead - so the other 14 collectors and the rest of
+    result is returned instead - so the other collectors and the rest of
     the report generation still complete successfully.
     """
     try:
@@ -80,12 +65,60 @@ def safe_collect(collector_name, collector_func):
         return fallback
 
 
-def _emit_dry_run(timestamp, now, failed_collectors):
-    """Builds a review sheet of every categorisation decision made this run."""
-    from utils import ENV_AUDIT
+def _audit_delta(before, after):
+    """The EnvAudit counters one collector added (after minus before)."""
+    delta = {key: after[key] - before[key] for key in ('total', 'by_tag', 'by_name', 'ambiguous')}
+    delta['env_counts'] = {
+        env: count - before['env_counts'].get(env, 0)
+        for env, count in after['env_counts'].items()
+        if count != before['env_counts'].get(env, 0)
+    }
+    return delta
 
+
+def _collect(enabled, store, scoped):
+    """
+    Runs (or reuses) every enabled collector. A collector whose stored
+    snapshot is younger than its max age is loaded from S3 instead of
+    re-run; each result is stamped with 'CollectedAt' (ISO, UTC) and
+    'FromSnapshot' so the report can show how old every section is.
+    Fresh results are saved as the next run's snapshots, except for
+    environment-scoped runs, whose results are deliberately partial.
+    Each snapshot keeps the environment-audit counters its collector
+    added, which are replayed on reuse so the run summary stays complete.
+    """
+    all_resources, reused = {}, []
+    audit = current_env_audit()
+    started = datetime.now(timezone.utc)
+    for name in COLLECTORS:
+        if name not in enabled:
+            all_resources[name] = fallback_for(name)
+            continue
+        snapshot = store.load(name) if store and store.is_fresh(name, COLLECTOR_MAX_AGES[name], started) else None
+        if snapshot:
+            data = dict(snapshot['data'])
+            data.update(CollectedAt=snapshot['collected_at'], FromSnapshot=True)
+            if audit:
+                audit.merge(snapshot.get('audit', {}))
+            reused.append(name)
+        else:
+            collected_at = datetime.now(timezone.utc).isoformat()
+            before = audit.counts() if audit else None
+            data = safe_collect(name, load_collector(name))
+            if store and not scoped and 'error' not in data:
+                store.save(name, data, collected_at, _audit_delta(before, audit.counts()) if audit else None)
+            data.update(CollectedAt=collected_at, FromSnapshot=False)
+        all_resources[name] = data
+    if reused:
+        print(f"Reused stored results for: {', '.join(reused)}")
+    return all_resources
+
+
+def _emit_dry_run(timestamp, now, failed_collectors, audit, graph, fast=False):
+    """Builds a review sheet of every categorisation decision made this run.
+    `graph` is None for a fast dry run, which collects no cross-references."""
     by_env = {}
-    for entry in ENV_AUDIT:
+    for entry in audit.entries:
         by_env.setdefault(entry['environment'], []).append(entry)
 
     lines = [
@@ -95,14 +128,18 @@ def _emit_dry_run(timestamp, now, failed_collectors):
         "or flagged ambiguous below needs either a proper `Environment` tag or an "
         "`ENV_ALIASES_JSON` override.\n",
     ]
+    if fast:
+        lines.append("> Fast dry run: resources were enumerated from names and tags only "
+                     "(Resource Groups Tagging API plus one list call per service). IAM roles "
+                     "and users are judged on their names alone.\n")
 
     if failed_collectors:
-        lines.append(f"> ⚠️ Collectors that failed this run: **{', '.join(sorted(failed_collectors))}**\n")
+        lines.append(f"> ⚠️ {'Resource types' if fast else 'Collectors'} that failed this run: **{', '.join(sorted(failed_collectors))}**\n")
 
-    total = len(ENV_AUDIT)
-    by_tag = sum(1 for e in ENV_AUDIT if e['source'].startswith('tag:'))
-    by_name = sum(1 for e in ENV_AUDIT if e['source'] == 'name')
-    uncategorized = len(by_env.get('no-category', []))
+    total = audit.total
+    by_tag = audit.by_tag
+    by_name = audit.by_name
+    uncategorized = audit.uncategorized
     lines.append("## Summary\n")
     lines.append("| Metric | Count |")
     lines.append("| :--- | ---: |")
@@ -111,7 +148,7 @@ def _emit_dry_run(timestamp, now, failed_collectors):
     lines.append(f"| Guessed from the name (verify these) | {by_name} |")
     lines.append(f"| Uncategorised | {uncategorized} |")
 
-    ambiguous = [e for e in ENV_AUDIT if e.get('ambiguous')]
+    ambiguous = [e for e in audit.entries if e.get('ambiguous')]
     if ambiguous:
         lines.append("\n## ⚠️ Ambiguous names (matched more than one environment)\n")
         lines.append("| Resource | Matched | Resolved to |")
@@ -119,6 +156,16 @@ def _emit_dry_run(timestamp, now, failed_collectors):
         for e in sorted(ambiguous, key=lambda x: x['name']):
             lines.append(f"| `{e['name']}` | {', '.join(e.get('all_matches') or [])} | **{e['environment']}** |")
 
+    # Cross-references found, so resource linking can be checked alongside
+    # detection before a full run.
+    edge_counts = graph.edge_counts() if graph is not None else {}
+    if edge_counts:
+        lines.append("\n## Cross-references found\n")
+        lines.append("| Link type | Count |")
+        lines.append("| :--- | ---: |")
+        for edge_type, count in sorted(edge_counts.items()):
+            lines.append(f"| `{edge_type}` | {count} |")
+
     lines.append("\n## Detected environments\n")
     for env_name in sorted(by_env):
         entries = by_env[env_name]
@@ -135,7 +182,7 @@ def _emit_dry_run(timestamp, now, failed_collectors):
     return {
         'statusCode': 200,
         'body': json.dumps({
-            'mode': 'dry_run',
+            'mode': 'dry_run_fast' if fast else 'dry_run',
             'resources_categorized': total,
             'resolved_by_tag': by_tag,
             'guessed_by_name': by_name,
@@ -152,65 +199,107 @@ def lambda_handler(event, context):
     now = datetime.now()
     timestamp = now.strftime("%Y-%m-%d")
 
-    # 1. Fetch data from all services into a single dictionary.
+    # Dry-run mode: emit only how each resource was categorised, so the
+    # environment detection can be sanity-checked against a project's real
+    # naming/tagging conventions BEFORE trusting a full report.
+    # Trigger with {"dry_run": true} in the test event, or DRY_RUN=true.
+    # {"dry_run": "fast"} / DRY_RUN=fast skips the full collectors and judges
+    # detection from names and tags alone - seconds rather than minutes.
+    dry_run_setting = str(event.get('dry_run', '')).lower() if isinstance(event, dict) else ''
+    dry_run_setting = dry_run_setting or os.environ.get('DRY_RUN', '').lower()
+    fast_dry_run = dry_run_setting == 'fast'
+    dry_run = fast_dry_run or dry_run_setting in ('1', 'true', 'yes')
+
+    # Which collectors run this invocation (see collectors/registry.py).
+    requested_services = event.get('services') if isinstance(event, dict) else None
+    enabled = resolve_collectors(requested_services or ENABLED_COLLECTORS)
+
+    # A fresh audit per invocation, so warm containers don't carry entries over.
+    # Per-resource entries are only kept when the dry-run sheet needs them.
+    audit = start_env_audit(detailed=dry_run)
+
+    # Warm-container response cache for slow-changing describe data.
+    # {"refresh": true} bypasses cached entries and stored snapshots for this run.
+    refresh = bool(event.get('refresh')) if isinstance(event, dict) else False
+    cache_stats = start_response_cache(refresh=refresh)
+
+    # Environment scope: {"environments": ["prod"]} documents only those
+    # environments. Membership is pre-resolved from names plus one bulk
+    # tagging-API sweep, so collectors skip their per-resource describes for
+    # everything else. Started (or cleared) on every invocation.
+    requested_envs = event.get('environments') if isinstance(event, dict) else None
+    if isinstance(requested_envs, str):
+        requested_envs = requested_envs.split(',')
+    # Detection always yields canonical names, so "production" or "stg" must
+    # be canonicalised the same way to match anything.
+    requested_envs = sorted({ENV_ALIASES.get(e.strip().lower(), e.strip().lower()) for e in requested_envs or [] if e.strip()})
+    tag_index = None
+    if requested_envs:
+        from collectors.inventory_collector import get_tag_index
+        try:
+            tag_index = get_tag_index()
+        except Exception as e:
+            print(f"WARN: could not pre-resolve tags for the environment scope ({e}); scoping by name only.")
+    scope = start_env_scope(requested_envs, tag_index)
+
+    if fast_dry_run:
+        from collectors.inventory_collector import get_inventory_data
+        inventory = safe_collect('inventory', lambda: get_inventory_data(enabled_categories(enabled), tag_index))
+        failed = inventory['failed'] + (['inventory'] if 'error' in inventory else [])
+        print(f"Inventory: {sum(len(v) for v in inventory['resources'].values())} resources, "
+              f"{inventory['tagged_resources']} tagged via the tagging API.")
+        if cache_stats:
+            print(cache_stats.summary())
+        return _emit_dry_run(timestamp, now, failed, audit, None, fast=True)
+
+    # 1. Fetch data from the enabled services into a single dictionary.
     # Each collector runs independently via safe_collect - a failure in one
-    # (e.g. IAM throttling) no longer prevents the other 14 from completing
-    # or the report from being generated and uploaded.
-    all_resources = {
-        'ec2': safe_collect('ec2', get_ec2_data),
-        'lambda': safe_collect('lambda', get_lambda_data),
-        's3': safe_collect('s3', get_s3_data),
-        'apigateway': safe_collect('apigateway', get_apigateway_data),
-        'vpc': safe_collect('vpc', get_vpc_data),
-        'rds': safe_collect('rds', get_rds_data),
-        'cognito': safe_collect('cognito', get_cognito_data),
-        'container': safe_collect('container', get_container_data),
-        'neptune': safe_collect('neptune', get_neptune_data),
-        'dynamodb': safe_collect('dynamodb', get_dynamodb_data),
-        'elasticache': safe_collect('elasticache', get_elasticache_data),
-        'queues': safe_collect('queues', get_queues_data),
-        'iam': safe_collect('iam', get_iam_data),
-        'sns': safe_collect('sns', get_sns_data),
-        'eventbridge': safe_collect('eventbridge', get_eventbridge_data),
-    }
+    # (e.g. IAM throttling) no longer prevents the others from completing
+    # or the report from being generated and uploaded. Disabled collectors
+    # are never imported and contribute their empty fallback shape.
+    if len(enabled) < len(COLLECTORS):
+        print(f"Running collectors: {', '.join(enabled)}")
+    # Collectors whose last stored result is still within their max age are
+    # loaded from S3 instead of re-run. A dry run always collects live, since
+    # it audits this run's detection decisions; {"refresh": true} does too.
+    store = start_snapshot_store(S3_BUCKET_NAME, refresh=refresh, enabled=not dry_run)
+    all_resources = _collect(enabled, store, scoped=bool(scope))
 
     failed_collectors = [name for name, data in all_resources.items() if data.get('error', '').startswith('(COLLECTION FAILED')]
     if failed_collectors:
         print(f"WARNING: The following collectors failed and were skipped: {', '.join(failed_collectors)}")
+    denied_collectors = [name for name, data in all_resources.items() if data.get('error') == '(NO IAM ACCESS)']
+    if denied_collectors:
+        print(f"WARNING: Access denied for {', '.join(denied_collectors)}. They need: "
+              f"{', '.join(required_iam_actions(denied_collectors))}")
 
-    # 1b. Dry-run mode: emit only how each resource was categorised, so the
-    # environment detection can be sanity-checked against a project's real
-    # naming/tagging conventions BEFORE trusting a full report.
-    # Trigger with {"dry_run": true} in the test event, or DRY_RUN=true.
-    dry_run = bool(event.get('dry_run')) if isinstance(event, dict) else False
-    dry_run = dry_run or os.environ.get('DRY_RUN', '').lower() in ('1', 'true', 'yes')
+    print(f"Categorised {audit.total} resources: {audit.by_tag} by tag, {audit.by_name} by name, "
+          f"{audit.uncategorized} uncategorised.")
+    if cache_stats:
+        print(cache_stats.summary())
+    if scope:
+        print(f"Scoped to {', '.join(requested_envs)}: skipped {scope.skipped} out-of-scope resources.")
+
+    # 1b. Build the run-wide resource graph: the single cross-reference layer
+    # (SG membership, subnets, triggers, LB targets, API routes, DB links)
+    # that the report, the diagrams and the dry-run sheet all query.
+    # One multi-pattern scan per env-var value finds every endpoint, table,
+    # queue, topic and bucket a Lambda references.
+    reference_matcher = build_reference_matcher(all_resources)
+    lambda_references = find_lambda_references(all_resources['lambda'].get('functions', []), reference_matcher)
+    graph = build_resource_graph(all_resources, lambda_references)
+    sg_reachability = build_sg_connectivity(graph, all_resources)
+
+    # 1c. Dry run stops here with just the detection review sheet.
     if dry_run:
-        return _emit_dry_run(timestamp, now, failed_collectors)
+        return _emit_dry_run(timestamp, now, failed_collectors, audit, graph)
     
     # 2. Consolidate and categorize all resources, safely getting lists
     categorized_data = {}
     resource_map = {
-        'instances': all_resources['ec2'].get('instances', []),
-        'security_groups': all_resources['ec2'].get('security_groups', []),
-        'functions': all_resources['lambda'].get('functions', []),
-        's3_buckets': all_resources['s3'].get('buckets', []),
-        'api_gateways': all_resources['apigateway'].get('apis', []),
-        'vpcs': all_resources['vpc'].get('vpcs', []),
-        'rds_instances': all_resources['rds'].get('instances', []),
-        'user_pools': all_resources['cognito'].get('user_pools', []),
-        'ecr_repositories': all_resources['container'].get('ecr_repositories', []),
-        'eks_clusters': all_resources['container'].get('eks_clusters', []),
-        'ecs_clusters': all_resources['container'].get('ecs_clusters', []),
-        'neptune_clusters': all_resources['neptune'].get('clusters', []),
-        'dynamodb_tables': all_resources['dynamodb'].get('tables', []),
-        'elasticache_clusters': all_resources['elasticache'].get('clusters', []),
-        'sqs_queues': all_resources['queues'].get('sqs_queues', []),
-        'kinesis_streams': all_resources['queues'].get('kinesis_streams', []),
-        'firehose_streams': all_resources['queues'].get('firehose_streams', []),
-        'iam_roles': all_resources['iam'].get('roles', []),
-        'iam_users': all_resources['iam'].get('users', []),
-        'sns_topics': all_resources['sns'].get('topics', []),
-        'eventbridge_buses': all_resources['eventbridge'].get('event_buses', [])
+        category: all_resources[name].get(key, [])
+        for name, spec in COLLECTORS.items()
+        for category, key in spec['outputs'].items()
     }
 
     for category_name, resource_list in resource_map.items():
@@ -221,41 +310,18 @@ def lambda_handler(event, context):
             if env not in categorized_data: categorized_data[env] = {}
             if category_name not in categorized_data[env]: categorized_data[env][category_name] = []
             categorized_data[env][category_name].append(resource)
+
+    # EventBridge rules carry their own environment (usually not their bus's),
+    # so an environment whose only resources are rules still gets documents.
+    for bus in resource_map['eventbridge_buses']:
+        for rule in bus.get('Rules', []):
+            categorized_data.setdefault(rule['Environment'], {})
+
+    # Cheap bulk-described resources (EC2, SGs, VPCs, RDS) are always collected
+    # so cross-references stay intact; only the requested environments render.
+    if scope:
+        categorized_data = {env: data for env, data in categorized_data.items() if env in scope.environments}
     
-    # 3. Build cross-reference maps
-    sg_cross_reference = {}
-    for instance in resource_map['instances']:
-        for sg_id in instance.get('SecurityGroups', []):
-            if sg_id not in sg_cross_reference: sg_cross_reference[sg_id] = []
-            sg_cross_reference[sg_id].append(f"EC2: {instance['Name']}")
-    for rds in resource_map['rds_instances']:
-        for sg_id in rds.get('SecurityGroupIds', []):
-            if sg_id not in sg_cross_reference: sg_cross_reference[sg_id] = []
-            sg_cross_reference[sg_id].append(f"RDS: {rds['Name']}")
-    for func in resource_map['functions']:
-        for sg_id in func.get('SecurityGroupIds', []):
-            if sg_id not in sg_cross_reference: sg_cross_reference[sg_id] = []
-            sg_cross_reference[sg_id].append(f"Lambda: {func['Name']}")
-    for vpc in resource_map['vpcs']:
-        for lb in vpc.get('LoadBalancers', []):
-            for sg_id in lb.get('SecurityGroupIds', []):
-                if sg_id not in sg_cross_reference: sg_cross_reference[sg_id] = []
-                sg_cross_reference[sg_id].append(f"Load Balancer: {lb['Name']}")
-
-    lambda_db_connections = []
-    db_endpoints = {}
-    for rds in all_resources['rds'].get('instances', []): db_endpoints[rds['Endpoint']] = "rds_" + rds['Name'].replace('-', '_')
-    for neptune in all_resources['neptune'].get('clusters', []): db_endpoints[neptune['Endpoint']] = "neptune_" + neptune['Name'].replace('-', '_')
-    for elasticache in all_resources['elasticache'].get('clusters', []): db_endpoints[elasticache['Endpoint']] = "elasticache_" + elasticache['Name'].replace('-', '_')
-    
-    for func in all_resources['lambda'].get('functions', []):
-        func_node_id = "lambda_" + func['Name'].replace('-', '_').replace('.', '_')
-        for key, value in func.get('EnvironmentVariables', {}).items():
-            for endpoint, db_node_id in db_endpoints.items():
-                if endpoint in value:
-                    lambda_db_connections.append({'from': func_node_id, 'to': db_node_id, 'label': key})
-                    break
-            
     # 4. Generate and upload reports
     main_readme_content = [f"# AWS Infrastructure Report", f"_Generated on {now.strftime('%Y-%m-%d %H:%M:%S')}_", "\n## Discovered Environments\n"]
     if not categorized_data:
@@ -266,18 +332,24 @@ def lambda_handler(event, context):
         main_readme_content.append(f"The following collectors failed and were skipped, so this report is incomplete for those services: **{', '.join(sorted(failed_collectors))}**.")
         main_readme_content.append("Check the Lambda's CloudWatch logs for this run for the specific error.\n")
 
+    if cache_stats and cache_stats.hits:
+        main_readme_content.append(f"\n_{cache_stats.hits} AWS responses were served from the warm-container cache "
+                                   f"and may be up to their service's cache TTL old. Invoke with "
+                                   f"`{{\"refresh\": true}}` for fully live data._\n")
+
     for env_name, env_data in sorted(categorized_data.items()):
         print(f"Generating documents for environment: {env_name}")
         main_readme_content.append(f"* [{env_name.upper()}](./{env_name}-documentation.md)")
 
-        report_content = generate_text_report(env_name, env_data, all_resources, sg_cross_reference)
-        diagram_content = generate_mermaid_diagram(env_name, env_data, all_resources, lambda_db_connections)
+        report_content = generate_text_report(env_name, env_data, all_resources, graph)
+        diagram_files = generate_mermaid_diagrams(env_name, env_data, graph, sg_reachability)
 
         s3_report_key = f'reports/{timestamp}/{env_name}-documentation.md'
-        s3_diagram_key = f'reports/{timestamp}/{env_name}-diagram.mmd'
-
         upload_to_s3(report_content, S3_BUCKET_NAME, s3_report_key)
-        upload_to_s3(diagram_content, S3_BUCKET_NAME, s3_diagram_key)
+
+        # Oversized diagrams come back as an overview plus linked part files.
+        for file_name, diagram_content in sorted(diagram_files.items()):
+            upload_to_s3(diagram_content, S3_BUCKET_NAME, f'reports/{timestamp}/{file_name}')
 
     s3_readme_key = f'reports/{timestamp}/README.md'
     upload_to_s3("\n".join(main_readme_content), S3_BUCKET_NAME, s3_readme_key)
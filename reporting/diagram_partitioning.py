@@ -0,0 +1,113 @@
+# reporting/diagram_partitioning.py
+from collections import Counter, deque
+
+
+def _connected_components(nodes, adjacency):
+    seen, components = set(), []
+    for start in sorted(nodes):
+        if start in seen:
+            continue
+        component, queue = [], deque([start])
+        seen.add(start)
+        while queue:
+            node = queue.popleft()
+            component.append(node)
+            for neighbour in sorted(adjacency.get(node, ())):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    queue.append(neighbour)
+        components.append(component)
+    return components
+
+
+def _label_propagation(nodes, adjacency, max_rounds=20):
+    """Community detection by deterministic label propagation: each node
+    repeatedly adopts the most common label among its neighbours (ties go
+    to the smallest label) until nothing changes."""
+    labels = {node: node for node in nodes}
+    members = set(nodes)
+    for _ in range(max_rounds):
+        changed = False
+        for node in sorted(nodes):
+            counts = Counter(labels[n] for n in adjacency.get(node, ()) if n in members)
+            if not counts:
+                continue
+            best = max(counts.values())
+            label = min(l for l, c in counts.items() if c == best)
+            if label != labels[node]:
+                labels[node], changed = label, True
+        if not changed:
+            break
+    communities = {}
+    for node in nodes:
+        communities.setdefault(labels[node], []).append(node)
+    return list(communities.values())
+
+
+def _links_into(group, members, adjacency):
+    """Number of (undirected) links from `group` into the node set `members`."""
+    return sum(len(adjacency.get(node, set()) & members) for node in group)
+
+
+def _internal_links(group, adjacency):
+    members = set(group)
+    return _links_into(group, members, adjacency) // 2
+
+
+def partition_nodes(nodes, edges, max_nodes, max_edges):
+    """
+    Splits a diagram's nodes into groups that each fit the node and edge
+    budget while keeping connected resources together.
+
+    1. Connected components are the natural unit - no edges are cut.
+    2. Components over budget are split into label-propagation communities;
+       any community still over budget is cut into BFS-ordered chunks.
+    3. Groups are packed first-fit-decreasing into as few partitions as the
+       budgets allow.
+
+    Returns a list of node sets, largest first.
+    """
+    adjacency = {}
+    for src, dst in edges:
+        if src != dst:
+            adjacency.setdefault(src, set()).add(dst)
+            adjacency.setdefault(dst, set()).add(src)
+
+    def fits(group):
+        return len(group) <= max_nodes and _internal_links(group, adjacency) <= max_edges
+
+    groups = []
+    for component in _connected_components(nodes, adjacency):
+        if fits(component):
+            groups.append(component)
+            continue
+        for community in _label_propagation(component, adjacency):
+            if fits(community):
+                groups.append(community)
+                continue
+            members = set(community)
+            ordered = _connected_components(community, {n: adjacency.get(n, set()) & members for n in community})
+            chunk, chunk_set, chunk_links = [], set(), 0
+            for node in (n for part in ordered for n in part):
+                links = len(adjacency.get(node, set()) & chunk_set)
+                if chunk and (len(chunk) >= max_nodes or chunk_links + links > max_edges):
+                    groups.append(chunk)
+                    chunk, chunk_set, chunk_links, links = [], set(), 0, 0
+                chunk.append(node)
+                chunk_set.add(node)
+                chunk_links += links
+            if chunk:
+                groups.append(chunk)
+
+    partitions = []  # [node_set, link_count]
+    for group in sorted(groups, key=len, reverse=True):
+        group_links = _internal_links(group, adjacency)
+        for partition in partitions:
+            merged_links = partition[1] + group_links + _links_into(group, partition[0], adjacency)
+            if len(partition[0]) + len(group) <= max_nodes and merged_links <= max_edges:
+                partition[0].update(group)
+                partition[1] = merged_links
+                break
+        else:
+            partitions.append([set(group), group_links])
+    return [node_set for node_set, _ in partitions]
@@ -1,4 +1,53 @@
 # reporting/markdown_report.py
+from datetime import datetime, timezone
+
+from analysis.resource_graph import NODE_TYPE_LABELS, event_rules_by_bus, sg_assignments
+
+# Section heading -> collector(s) whose data it renders, for the data-age note.
+_SECTION_COLLECTORS = {
+    'VPCs and Networking': ['vpc'],
+    'EC2 Instances': ['ec2'],
+    'Container Services (ECR, EKS, ECS)': ['container'],
+    'Relational Databases (RDS)': ['rds'],
+    'Graph Databases (Neptune)': ['neptune'],
+    'NoSQL Databases (DynamoDB)': ['dynamodb'],
+    'In-Memory Cache (ElastiCache)': ['elasticache'],
+    'API Gateways': ['apigateway'],
+    'Lambda Functions': ['lambda'],
+    'S3 Buckets': ['s3'],
+    'Security Group Rules': ['ec2'],
+    'Identity (Cognito)': ['cognito'],
+    'Identity & Access Management (IAM)': ['iam'],
+    'Queues & Streams (SQS, Kinesis)': ['queues'],
+    'Pub/Sub & Events (SNS, EventBridge)': ['sns', 'eventbridge'],
+}
+
+
+def _format_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes} min"
+    hours = minutes // 60
+    return f"{hours}h" if hours < 24 else f"{hours // 24}d {hours % 24}h"
+
+
+def _data_age_notes(section, all_resources, now=None):
+    """One italic line per collector behind a section, saying when its data
+    was collected and whether it was reused from a stored run."""
+    now = now or datetime.now(timezone.utc)
+    notes = []
+    for collector in _SECTION_COLLECTORS.get(section, []):
+        data = all_resources.get(collector, {})
+        if not data.get('CollectedAt') or data.get('error'):
+            continue
+        collected = datetime.fromisoformat(data['CollectedAt'])
+        label = f"{collector} data" if len(_SECTION_COLLECTORS[section]) > 1 else "Data"
+        if data.get('FromSnapshot'):
+            source = f"reused from a stored run, {_format_age((now - collected).total_seconds())} old"
+        else:
+            source = "collected this run"
+        notes.append(f"_{label} as of {collected:%Y-%m-%d %H:%M} UTC ({source})._\n")
+    return notes
 
 def parse_ip_permission(rule):
     """Parses a security group rule into its components for table formatting."""
@@ -20,19 +69,18 @@ def parse_ip_permission(rule):
         parsed_rules.append({ 'protocol': protocol, 'port_range': port_range, 'source_dest': source })
     return parsed_rules
 
-def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
+def generate_text_report(env_name, env_data, all_resources, graph):
     """
     Generates a structured Markdown report for a SINGLE environment,
     including a cross-reference for Security Group assignments.
+    Subnet/SG names and SG assignments are looked up on the run-wide
+    ResourceGraph (analysis.resource_graph).
     """
     report = [f"## ENVIRONMENT: `{env_name.upper()}`\n"]
     
-    ec2_maps = all_resources.get('ec2', {})
-    subnet_map = ec2_maps.get('subnet_map', {})
-    sg_map = ec2_maps.get('sg_map', {})
-
     # --- VPCs and Networking Section ---
     report.append("\n### VPCs and Networking\n")
+    report.extend(_data_age_notes("VPCs and Networking", all_resources))
     if all_resources.get('vpc', {}).get('error'):
         report.append(f"_{all_resources['vpc']['error']}_")
     elif env_data.get('vpcs'):
@@ -77,20 +125,22 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- EC2 Instances Section ---
     report.append("\n### EC2 Instances\n")
+    report.extend(_data_age_notes("EC2 Instances", all_resources))
     if all_resources.get('ec2', {}).get('error'):
         report.append(f"_{all_resources['ec2']['error']}_")
     elif env_data.get('instances'):
         report.append("| Instance Name | Instance ID | Subnet | Security Groups |")
         report.append("| :--- | :--- | :--- | :--- |")
         for item in sorted(env_data['instances'], key=lambda x: x['Name']):
-            subnet_name = subnet_map.get(item.get('SubnetId'), item.get('SubnetId', 'N/A'))
-            sg_names = [sg_map.get(sg_id, sg_id) for sg_id in item.get('SecurityGroups', [])]
+            subnet_name = graph.name_for_id(item.get('SubnetId', 'N/A'))
+            sg_names = [graph.name_for_id(sg_id) for sg_id in item.get('SecurityGroups', [])]
             report.append(f"| **{item['Name']}** | `{item['InstanceId']}` | {subnet_name} | {', '.join(sg_names)} |")
     else:
         report.append("_No EC2 Instances found in this environment._")
 
  # --- Container Services Section ---
     report.append("\n### Container Services (ECR, EKS, ECS)\n")
+    report.extend(_data_age_notes("Container Services (ECR, EKS, ECS)", all_resources))
     if all_resources.get('container', {}).get('error'):
         report.append(f"_{all_resources['container']['error']}_")
     else:
@@ -117,27 +167,31 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
                 report.append(f"* **Cluster: {cluster['Name']}** (Status: `{cluster['Status']}`)")
                 if cluster.get('Services'):
                     report.append("  * **Services:**")
-                    report.append("    | Service Name | Status | Launch Type | Desired Tasks |")
-                    report.append("    | :--- | :--- | :--- | :--- |")
+                    report.append("    | Service Name | Status | Launch Type | Desired Tasks | Task Definition | Images | CPU / Memory |")
+                    report.append("    | :--- | :--- | :--- | :--- | :--- | :--- | :--- |")
                     for service in sorted(cluster['Services'], key=lambda x: x['Name']):
-                        report.append(f"    | {service['Name']} | {service['Status']} | `{service['LaunchType']}` | {service['DesiredCount']} |")
+                        images = ", ".join(f"`{image}`" for image in service.get('Images', [])) or "N/A"
+                        report.append(f"    | {service['Name']} | {service['Status']} | `{service['LaunchType']}` | {service['DesiredCount']} "
+                                      f"| `{service.get('TaskDefinition', 'N/A')}` | {images} | {service.get('Cpu', 'N/A')} / {service.get('Memory', 'N/A')} |")
 
     # --- Relational Databases (RDS) Section ---
     report.append("\n### Relational Databases (RDS)\n")
+    report.extend(_data_age_notes("Relational Databases (RDS)", all_resources))
     if all_resources.get('rds', {}).get('error'):
         report.append(f"_{all_resources['rds']['error']}_")
     elif env_data.get('rds_instances'):
         report.append("| Instance Name | Engine | Size | Endpoint | Subnets | Security Groups |")
         report.append("| :--- | :--- | :--- | :--- | :--- | :--- |")
         for item in sorted(env_data['rds_instances'], key=lambda x: x['Name']):
-            subnets = ", ".join([subnet_map.get(s_id, s_id) for s_id in item['SubnetIds']])
-            sgs = ", ".join([sg_map.get(sg_id, sg_id) for sg_id in item['SecurityGroupIds']])
+            subnets = ", ".join([graph.name_for_id(s_id) for s_id in item['SubnetIds']])
+            sgs = ", ".join([graph.name_for_id(sg_id) for sg_id in item['SecurityGroupIds']])
             report.append(f"| **{item['Name']}** | {item['Engine']} | `{item['InstanceClass']}` | `{item['Endpoint']}` | {subnets} | {sgs} |")
     else:
         report.append("_No RDS Instances found in this environment._")
 
     # --- Neptune Section ---
     report.append("\n### Graph Databases (Neptune)\n")
+    report.extend(_data_age_notes("Graph Databases (Neptune)", all_resources))
     if all_resources.get('neptune', {}).get('error'):
         report.append(f"_{all_resources['neptune']['error']}_")
     elif env_data.get('neptune_clusters'):
@@ -151,14 +205,15 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
                 report.append("    | :--- | :--- | :--- | :--- | :--- |")
                 for inst in sorted(cluster['Instances'], key=lambda x: x['Name']):
                     role = "Writer" if inst['IsClusterWriter'] else "Reader"
-                    subnets = ", ".join([subnet_map.get(s_id, s_id) for s_id in inst['SubnetIds']])
-                    sgs = ", ".join([sg_map.get(sg_id, sg_id) for sg_id in inst['SecurityGroupIds']])
+                    subnets = ", ".join([graph.name_for_id(s_id) for s_id in inst['SubnetIds']])
+                    sgs = ", ".join([graph.name_for_id(sg_id) for sg_id in inst['SecurityGroupIds']])
                     report.append(f"    | `{inst['Name']}` | `{inst['InstanceClass']}` | {role} | {subnets} | {sgs} |")
     else:
         report.append("_No Neptune Clusters found in this environment._")
     
     # --- DynamoDB Section ---
     report.append("\n### NoSQL Databases (DynamoDB)\n")
+    report.extend(_data_age_notes("NoSQL Databases (DynamoDB)", all_resources))
     if all_resources.get('dynamodb', {}).get('error'):
         report.append(f"_{all_resources['dynamodb']['error']}_")
     elif env_data.get('dynamodb_tables'):
@@ -171,6 +226,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- Elasticache Section ---
     report.append("\n### In-Memory Cache (ElastiCache)\n")
+    report.extend(_data_age_notes("In-Memory Cache (ElastiCache)", all_resources))
     if all_resources.get('elasticache', {}).get('error'):
         report.append(f"_{all_resources['elasticache']['error']}_")
     elif env_data.get('elasticache_clusters'):
@@ -183,6 +239,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- API Gateways Section ---
     report.append("\n### API Gateways\n")
+    report.extend(_data_age_notes("API Gateways", all_resources))
     if all_resources.get('apigateway', {}).get('error'):
         report.append(f"_{all_resources['apigateway']['error']}_")
     elif env_data.get('api_gateways'):
@@ -199,6 +256,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- Lambda Functions Section ---
     report.append("\n### Lambda Functions\n")
+    report.extend(_data_age_notes("Lambda Functions", all_resources))
     if all_resources.get('lambda', {}).get('error'):
         report.append(f"_{all_resources['lambda']['error']}_")
     elif env_data.get('functions'):
@@ -207,8 +265,8 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
         for item in sorted(env_data['functions'], key=lambda x: x['Name']):
             if item.get('VpcId'):
                 vpc_connected = "Yes"
-                subnet_names = [subnet_map.get(s_id, s_id) for s_id in item.get('SubnetIds', [])]
-                sg_names = [sg_map.get(sg_id, sg_id) for sg_id in item.get('SecurityGroupIds', [])]
+                subnet_names = [graph.name_for_id(s_id) for s_id in item.get('SubnetIds', [])]
+                sg_names = [graph.name_for_id(sg_id) for sg_id in item.get('SecurityGroupIds', [])]
             else:
                 vpc_connected = "No"; subnet_names = ["N/A"]; sg_names = ["N/A"]
             report.append(f"| **{item['Name']}** | `{item.get('Runtime', 'N/A')}` | {vpc_connected} | {', '.join(subnet_names)} | {', '.join(sg_names)} |")
@@ -217,6 +275,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- S3 Buckets Section ---
     report.append("\n### S3 Buckets\n")
+    report.extend(_data_age_notes("S3 Buckets", all_resources))
     if all_resources.get('s3', {}).get('error'):
         report.append(f"_{all_resources['s3']['error']}_")
     elif env_data.get('s3_buckets'):
@@ -227,6 +286,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
     
     # --- Security Group Rules Section ---
     report.append("\n### Security Group Rules\n")
+    report.extend(_data_age_notes("Security Group Rules", all_resources))
     if all_resources.get('ec2', {}).get('error'):
         report.append(f"_{all_resources['ec2']['error']}_")
     elif env_data.get('security_groups'):
@@ -235,7 +295,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
         for item in sorted(env_data['security_groups'], key=lambda x: x['Name']):
             sg_name_full = f"**{item['Name']}** (`{item['GroupId']}`)"
             
-            assignments = sg_cross_reference.get(item['GroupId'], ["_Not in use_"])
+            assignments = sg_assignments(graph, item['GroupId']) or ["_Not in use_"]
             assignments_str = "<br>".join(assignments)
 
             is_first_rule_for_group = True
@@ -256,11 +316,13 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
     
     # --- Cognito Section ---
     report.append("\n### Identity (Cognito)\n")
+    report.extend(_data_age_notes("Identity (Cognito)", all_resources))
     if all_resources.get('cognito', {}).get('error'):
         report.append(f"_{all_resources['cognito']['error']}_")
     elif env_data.get('user_pools'):
         for pool in sorted(env_data['user_pools'], key=lambda x: x['Name']):
-            report.append(f"* **User Pool: {pool['Name']}** (`{pool['Id']}`)")
+            report.append(f"* **User Pool: {pool['Name']}** (`{pool['Id']}`, MFA: `{pool.get('MfaConfiguration', 'N/A')}`, "
+                          f"Estimated Users: {pool.get('EstimatedUsers', 'N/A')})")
             if pool.get('AppClients'):
                 for client in pool['AppClients']:
                     report.append(f"  * **App Client:** {client['ClientName']} (`{client['ClientId']}`)")
@@ -269,6 +331,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- IAM Section ---
     report.append("\n### Identity & Access Management (IAM)\n")
+    report.extend(_data_age_notes("Identity & Access Management (IAM)", all_resources))
     if all_resources.get('iam', {}).get('error'):
         report.append(f"_{all_resources['iam']['error']}_")
     else:
@@ -301,6 +364,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- Queues and Streams Sections  ---
     report.append("\n### Queues & Streams (SQS, Kinesis)\n")
+    report.extend(_data_age_notes("Queues & Streams (SQS, Kinesis)", all_resources))
     if all_resources.get('queues', {}).get('error'):
         report.append(f"_{all_resources['queues']['error']}_")
     else:
@@ -315,7 +379,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
         # Kinesis Data Streams
         if env_data.get('kinesis_streams'):
             report.append("\n#### Kinesis Data Streams\n")
-            report.append("| Stream Name | Status | Shard Count |")
+            report.append("| Stream Name | Status | Open Shards |")
             report.append("| :--- | :--- | :--- |")
             for item in sorted(env_data['kinesis_streams'], key=lambda x: x['Name']):
                 report.append(f"| **{item['Name']}** | {item['Status']} | {item['Shards']} |")
@@ -330,6 +394,7 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
 
     # --- SNS & EventBridge Section ---
     report.append("\n### Pub/Sub & Events (SNS, EventBridge)\n")
+    report.extend(_data_age_notes("Pub/Sub & Events (SNS, EventBridge)", all_resources))
 
     # SNS
     if all_resources.get('sns', {}).get('error'):
@@ -339,7 +404,12 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
         for topic in sorted(env_data['sns_topics'], key=lambda x: x['Name']):
             fifo_tag = " `FIFO`" if topic['IsFifo'] else ""
             report.append(f"* **{topic['Name']}**{fifo_tag}")
-            if topic.get('Subscriptions'):
+            summary = topic.get('SubscriptionSummary')
+            if summary:
+                counts = ", ".join(f"{protocol}: {count}" for protocol, count in sorted(summary['ProtocolCounts'].items()))
+                report.append(f"  * **{topic['SubscriptionCount']} subscriptions** ({counts})")
+                report.append(f"  * Sample endpoints: {', '.join(f'`{e}`' for e in summary['SampleEndpoints'])}")
+            elif topic.get('Subscriptions'):
                 report.append("  | Protocol | Endpoint |")
                 report.append("  | :--- | :--- |")
                 for sub in topic['Subscriptions']:
@@ -350,21 +420,33 @@ def generate_text_report(env_name, env_data, all_resources, sg_cross_reference):
         report.append("_No SNS Topics found in this environment._")
 
     # EventBridge
+    # Rules are listed under the environment they belong to, as in the
+    # diagram, even when their bus (usually 'default') belongs to another.
+    rules_by_bus = event_rules_by_bus(graph, env_name)
+    bus_names = {bus['Name'] for bus in env_data.get('eventbridge_buses', [])} | set(rules_by_bus)
     if all_resources.get('eventbridge', {}).get('error'):
         report.append(f"\n_{all_resources['eventbridge']['error']}_")
-    elif env_data.get('eventbridge_buses'):
+    elif bus_names:
+        has_rules = {bus['Name'] for bus in all_resources.get('eventbridge', {}).get('event_buses', []) if bus.get('Rules')}
         report.append("\n#### EventBridge\n")
-        for bus in sorted(env_data['eventbridge_buses'], key=lambda x: x['Name']):
-            report.append(f"* **Event Bus: {bus['Name']}**")
-            if bus.get('Rules'):
-                for rule in sorted(bus['Rules'], key=lambda x: x['Name']):
+        for bus_name in sorted(bus_names):
+            report.append(f"* **Event Bus: {bus_name}**")
+            if rules_by_bus.get(bus_name):
+                for rule in sorted(rules_by_bus[bus_name], key=lambda x: x['Name']):
                     trigger = rule['ScheduleExpression'] if rule['ScheduleExpression'] != 'N/A' else (
                         "Event Pattern" if rule['HasEventPattern'] else "N/A"
                     )
                     report.append(f"  * **Rule: {rule['Name']}** (State: `{rule['State']}`, Trigger: `{trigger}`)")
                     if rule.get('Targets'):
                         for target in rule['Targets']:
-                            report.append(f"    * Target: `{target['Arn']}`")
+                            # Targets that are collected resources were resolved by ARN in the graph.
+                            target_node = graph.by_arn(target['Arn'])
+                            if target_node:
+                                report.append(f"    * Target: {NODE_TYPE_LABELS[target_node[0]]} `{graph.display_name(target_node)}`")
+                            else:
+                                report.append(f"    * Target: `{target['Arn']}`")
+            elif bus_name in has_rules:
+                report.append("  * _No rules in this environment_")
             else:
                 report.append("  * _No rules defined_")
     else:
@@ -1,15 +1,39 @@
 # reporting/mermaid_diagram.py
+import os
+
+from analysis.resource_graph import CONNECTS_TO_DB, REFERENCES, ROUTES_TO, TARGETS, TRIGGERS
+from analysis.sg_connectivity import inferred_connections
+from reporting.diagram_partitioning import partition_nodes
+
+# Render budget per .mmd file. Above either limit, generate_mermaid_diagrams
+# splits the environment into linked part files plus an overview.
+# DIAGRAM_PARTITIONING=off always writes a single file.
+MERMAID_MAX_NODES = int(os.environ.get('MERMAID_MAX_NODES', '250'))
+MERMAID_MAX_EDGES = int(os.environ.get('MERMAID_MAX_EDGES', '500'))
+DIAGRAM_PARTITIONING = os.environ.get('DIAGRAM_PARTITIONING', 'auto').lower()
+
+# (subgraph title, style) in the order sections are drawn.
+_SECTIONS = [
+    ('EntryPoint', 'fill:#2E7D32,stroke:#1B5E20,color:#FFFFFF'),
+    ('Processor', 'fill:#1976D2,stroke:#0D47A1,color:#FFFFFF'),
+    ("'Messaging Queue'", 'fill:#6A1B9A,stroke:#4A148C,color:#FFFFFF'),
+    ('Databases', 'fill:#F57F17,stroke:#E65100,color:#FFFFFF'),
+    ("'Security Groups'", 'fill:#546E7A,stroke:#37474F,color:#FFFFFF'),
+]
+_STYLE_ORDER = ['EntryPoint', 'Processor', 'Databases', "'Messaging Queue'", "'Security Groups'"]
 
 def to_node_id(name, prefix=""):
     """Creates a Mermaid-safe node ID from a resource name."""
     safe_name = name.replace('-', '_').replace('.', '_').replace('/', '_')
     return f"{prefix}_{safe_name}"
 
-def generate_mermaid_diagram(env_name, env_data, all_resources, lambda_db_connections):
+def _build_diagram(env_name, env_data, graph, sg_reachability):
     """
-    Generates a structured Mermaid.js flowchart diagram with subgraphs and inferred network connections.
+    Collects one environment's nodes (grouped by section) and connections.
+    `graph` is the run-wide ResourceGraph from analysis.resource_graph and
+    `sg_reachability` the per-run result of build_sg_connectivity.
     """
-    entrypoint_nodes, processor_nodes, messaging_nodes, database_nodes = {}, {}, {}, {}
+    entrypoint_nodes, processor_nodes, messaging_nodes, database_nodes, sg_hub_nodes = {}, {}, {}, {}, {}
     connections = set()
 
     # --- 1. Collect and Define All Nodes, Grouped by Section ---
@@ -18,6 +42,13 @@ def generate_mermaid_diagram(env_name, env_data, all_resources, lambda_db_connec
     for vpc in env_data.get('vpcs', []):
         for lb in vpc.get('LoadBalancers', []):
             entrypoint_nodes[to_node_id(lb['Name'], 'lb')] = f'        {to_node_id(lb["Name"], "lb")}["fa:fa-network-wired {lb["Name"]}"]'
+    # EventBridge rules carry their own environment, whatever their bus's is;
+    # only rules whose targets were resolved to collected resources are drawn.
+    for node_type, rule_key in graph.in_env(env_name):
+        if node_type == 'rule' and graph.neighbors(('rule', rule_key), TRIGGERS):
+            rule = graph.nodes[('rule', rule_key)]['data']
+            icon = 'fa:fa-clock' if rule['ScheduleExpression'] != 'N/A' else 'fa:fa-filter'
+            entrypoint_nodes[to_node_id(rule_key, 'rule')] = f'        {to_node_id(rule_key, "rule")}(["{icon} {rule["Name"]}"])'
     for instance in env_data.get('instances', []):
         processor_nodes[to_node_id(instance['Name'], 'ec2')] = f'        {to_node_id(instance["Name"], "ec2")}["fa:fa-desktop {instance["Name"]}"]'
     for cluster in env_data.get('ecs_clusters', []):
@@ -43,101 +74,130 @@ def generate_mermaid_diagram(env_name, env_data, all_resources, lambda_db_connec
     all_nodes = {**entrypoint_nodes, **processor_nodes, **messaging_nodes, **database_nodes}
 
     # --- 2. Define Connections Between Nodes ---
-    instance_id_to_name = {i['InstanceId']: i['Name'] for i in all_resources.get('ec2', {}).get('instances', [])}
-    for vpc in all_resources.get('vpc', {}).get('vpcs', []):
-        for lb in vpc.get('LoadBalancers', []):
-            if to_node_id(lb['Name'], 'lb') in all_nodes:
-                for listener in lb.get('Listeners', []):
-                    for tg in listener.get('TargetGroups', []):
-                        for target in tg.get('Targets', []):
-                            if instance_name := instance_id_to_name.get(target['Id']):
-                                connections.add(f"    {to_node_id(lb['Name'], 'lb')} --> {to_node_id(instance_name, 'ec2')}")
-    for api in env_data.get('api_gateways', []):
-        for route in api.get('Routes', []):
-            if 'Lambda:' in route['Target']:
-                connections.add(f"    {to_node_id(api['Name'], 'api')} --> {to_node_id(route['Target'].split('`')[1], 'lambda')}")
-    for conn in lambda_db_connections:
-        if conn['from'] in all_nodes and conn['to'] in all_nodes:
-            connections.add(f"    {conn['from']} --> {conn['to']}")
-    dynamo_tables = {t['Name'] for t in env_data.get('dynamodb_tables', [])}
-    sqs_queues = {q['Name'] for q in env_data.get('sqs_queues', [])}
-    for func in env_data.get('functions', []):
-        func_node_id = to_node_id(func['Name'], 'lambda')
-        for _, value in func.get('EnvironmentVariables', {}).items():
-            for table in dynamo_tables:
-                if table in value: connections.add(f"    {func_node_id} --> {to_node_id(table, 'dynamo')}")
-            for queue in sqs_queues:
-                if queue in value: connections.add(f"    {func_node_id} --> {to_node_id(queue, 'sqs')}")
-    event_source_mappings = all_resources.get('lambda', {}).get('event_source_mappings', [])
-    env_function_names = {f['Name'] for f in env_data.get('functions', [])}
-    for mapping in event_source_mappings:
-        try:
-            function_name = mapping['FunctionArn'].split(':')[-1]
-            if function_name in env_function_names and ':sqs:' in mapping['EventSourceArn']:
-                connections.add(f"    {to_node_id(mapping['EventSourceArn'].split(':')[-1], 'sqs')} --> {to_node_id(function_name, 'lambda')}")
-        except (IndexError, KeyError): continue
+    # Only this environment's nodes are visited; every cross-reference is an
+    # O(degree) query on the run-wide resource graph.
+    env_graph_nodes = {to_node_id(key, node_type): (node_type, key) for node_type, key in graph.in_env(env_name)}
+    env_graph_nodes = {node_id: graph_id for node_id, graph_id in env_graph_nodes.items() if node_id in all_nodes}
+    for node_id, graph_id in env_graph_nodes.items():
+        for edge_type in (TARGETS, ROUTES_TO):
+            for target_type, target_key in graph.neighbors(graph_id, edge_type):
+                connections.add(f"    {node_id} --> {to_node_id(target_key, target_type)}")
+        for source_type, source_key in graph.predecessors(graph_id, TRIGGERS):
+            # Sources from other environments were never declared here, and
+            # Mermaid would draw them as bare IDs.
+            source_node_id = to_node_id(source_key, source_type)
+            if source_node_id in all_nodes:
+                connections.add(f"    {source_node_id} --> {node_id}")
+        # Env-var references (DB endpoints, DynamoDB tables, SQS queues).
+        for edge_type in (CONNECTS_TO_DB, REFERENCES):
+            for target_type, target_key in graph.neighbors(graph_id, edge_type):
+                target_node_id = to_node_id(target_key, target_type)
+                if target_node_id in all_nodes:
+                    connections.add(f"    {node_id} --> {target_node_id}")
 
     # --- 2b. Inferred Network Connections from Security Groups ---
-    sg_to_resources = {}
-    all_resources_flat = [
-        *all_resources.get('ec2', {}).get('instances', []),
-        *all_resources.get('rds', {}).get('instances', []),
-        *all_resources.get('lambda', {}).get('functions', []),
-    ]
-    # Add other resources like Neptune, LBs if they need to be part of this logic
-    for resource in all_resources_flat:
-        resource_type_prefix = ''
-        if 'InstanceId' in resource: resource_type_prefix = 'ec2'
-        elif 'DBInstanceIdentifier' in resource: resource_type_prefix = 'rds'
-        elif 'FunctionName' in resource: resource_type_prefix = 'lambda'
-        
-        node_id = to_node_id(resource['Name'], resource_type_prefix)
-        sg_ids = resource.get('SecurityGroups', []) or resource.get('SecurityGroupIds', [])
-        for sg_id in sg_ids:
-            if sg_id not in sg_to_resources: sg_to_resources[sg_id] = []
-            sg_to_resources[sg_id].append(node_id)
-            
-    for sg_details in all_resources.get('ec2', {}).get('security_groups', []):
-        dest_sg_id = sg_details['GroupId']
-        dest_nodes = [n for n in sg_to_resources.get(dest_sg_id, []) if n in all_nodes]
-        if not dest_nodes: continue
-
-        for rule in sg_details.get('InboundRules', []):
-            for pair in rule.get('UserIdGroupPairs', []):
-                if source_sg_id := pair.get('GroupId'):
-                    source_nodes = [n for n in sg_to_resources.get(source_sg_id, []) if n in all_nodes]
-                    for src in source_nodes:
-                        for dest in dest_nodes:
-                            if src != dest:
-                                # Using a dotted arrow for inferred connections
-                                connections.add(f"    {src} -.-> {dest}")
-
-    # --- 3. Assemble the MMD file ---
+    # Reachability (SG-to-SG and in-VPC CIDR rules) was computed once per run;
+    # large fan-outs are routed through one hub node per SG so a shared group
+    # with hundreds of members doesn't become tens of thousands of edges.
+    pairs, hubs = inferred_connections(graph, sg_reachability, env_graph_nodes.values())
+    for (src_type, src_key), (dest_type, dest_key) in pairs:
+        # Using a dotted arrow for inferred connections
+        connections.add(f"    {to_node_id(src_key, src_type)} -.-> {to_node_id(dest_key, dest_type)}")
+    for sg_graph_id, (sources, dests) in hubs.items():
+        hub_id = to_node_id(sg_graph_id[1], 'sg')
+        sg_hub_nodes[hub_id] = f'        {hub_id}{{{{"fa:fa-shield-alt {graph.display_name(sg_graph_id)}"}}}}'
+        for src_type, src_key in sources:
+            connections.add(f"    {to_node_id(src_key, src_type)} -.-> {hub_id}")
+        for dest_type, dest_key in dests:
+            connections.add(f"    {hub_id} -.-> {to_node_id(dest_key, dest_type)}")
+
+    sections = {
+        'EntryPoint': entrypoint_nodes, 'Processor': processor_nodes, "'Messaging Queue'": messaging_nodes,
+        'Databases': database_nodes, "'Security Groups'": sg_hub_nodes,
+    }
+    return sections, connections
+
+
+def _render_mmd(title, sections, connections, notes=()):
+    """Assembles the MMD text for a set of sectioned nodes and connections."""
     mmd = ["flowchart LR"]
-    mmd.append(f'\nsubgraph "ENVIRONMENT: {env_name.upper()}"')
+    mmd.append(f'\nsubgraph "{title}"')
     mmd.append("    direction LR")
-    if entrypoint_nodes:
-        mmd.append("\n    subgraph EntryPoint")
-        mmd.extend(sorted(entrypoint_nodes.values())); mmd.append("    end")
-    if processor_nodes:
-        mmd.append("\n    subgraph Processor")
-        mmd.extend(sorted(processor_nodes.values())); mmd.append("    end")
-    if messaging_nodes:
-        mmd.append("\n    subgraph 'Messaging Queue'")
-        mmd.extend(sorted(messaging_nodes.values())); mmd.append("    end")
-    if database_nodes:
-        mmd.append("\n    subgraph Databases")
-        mmd.extend(sorted(database_nodes.values())); mmd.append("    end")
+    for section, _ in _SECTIONS:
+        if sections.get(section):
+            mmd.append(f"\n    subgraph {section}")
+            mmd.extend(sorted(sections[section].values())); mmd.append("    end")
     if connections:
         mmd.append("\n    %% --- Connections ---")
         mmd.extend(sorted(list(connections)))
     mmd.append("end")
+    mmd.extend(notes)
 
-    # --- 4. Styling ---
+    # --- Styling ---
+    styles = dict(_SECTIONS)
     mmd.append("\n%% --- Styling ---")
-    if entrypoint_nodes: mmd.append(f"style {','.join(entrypoint_nodes.keys())} fill:#2E7D32,stroke:#1B5E20,color:#FFFFFF")
-    if processor_nodes: mmd.append(f"style {','.join(processor_nodes.keys())} fill:#1976D2,stroke:#0D47A1,color:#FFFFFF")
-    if database_nodes: mmd.append(f"style {','.join(database_nodes.keys())} fill:#F57F17,stroke:#E65100,color:#FFFFFF")
-    if messaging_nodes: mmd.append(f"style {','.join(messaging_nodes.keys())} fill:#6A1B9A,stroke:#4A148C,color:#FFFFFF")
+    for section in _STYLE_ORDER:
+        if sections.get(section):
+            mmd.append(f"style {','.join(sections[section].keys())} {styles[section]}")
     
-    return "\n".join(mmd)
\ No newline at end of file
+    return "\n".join(mmd)
+
+
+def generate_mermaid_diagrams(env_name, env_data, graph, sg_reachability):
+    """
+    Generates a structured Mermaid.js flowchart diagram with subgraphs and
+    inferred network connections. An environment whose diagram exceeds
+    MERMAID_MAX_NODES / MERMAID_MAX_EDGES is split into part files that each
+    render quickly, plus an overview linking them.
+
+    Returns {file_name: mmd_content}; a diagram within budget is the single
+    '{env}-diagram.mmd' as before, and when split that name holds the overview.
+    """
+    sections, connections = _build_diagram(env_name, env_data, graph, sg_reachability)
+    main_file = f"{env_name}-diagram.mmd"
+    node_section = {node_id: section for section, nodes in sections.items() for node_id in nodes}
+    within_budget = len(node_section) <= MERMAID_MAX_NODES and len(connections) <= MERMAID_MAX_EDGES
+    if DIAGRAM_PARTITIONING == 'off' or within_budget:
+        return {main_file: _render_mmd(f"ENVIRONMENT: {env_name.upper()}", sections, connections)}
+
+    # Connections are "    src --> dst" / "    src -.-> dst" lines.
+    edges = [(parts[0], parts[-1]) for parts in (line.split() for line in connections)]
+    partitions = partition_nodes(list(node_section), edges, MERMAID_MAX_NODES, MERMAID_MAX_EDGES)
+    part_of = {node_id: index for index, members in enumerate(partitions, start=1) for node_id in members}
+    print(f"Diagram for {env_name} has {len(node_section)} nodes / {len(connections)} connections; "
+          f"split into {len(partitions)} parts.")
+
+    files, cross_links = {}, {}
+    part_connections = {index: set() for index in range(1, len(partitions) + 1)}
+    for line, (src, dst) in zip(connections, edges):
+        src_part, dst_part = part_of.get(src), part_of.get(dst)
+        if src_part is not None and src_part == dst_part:
+            part_connections[src_part].add(line)
+        elif src_part is not None and dst_part is not None:
+            cross_links[(src_part, dst_part)] = cross_links.get((src_part, dst_part), 0) + 1
+        elif src_part is not None or dst_part is not None:
+            # Edge to a node outside this environment, kept with its endpoint.
+            part_connections[src_part or dst_part].add(line)
+
+    for index, members in enumerate(partitions, start=1):
+        part_sections = {section: {n: line for n, line in nodes.items() if n in members} for section, nodes in sections.items()}
+        outgoing = sum(count for (src_part, dst_part), count in cross_links.items() if index in (src_part, dst_part))
+        notes = [f"\n%% {outgoing} connections to other parts are summarised in {main_file}"] if outgoing else []
+        files[f"{env_name}-diagram-part-{index}.mmd"] = _render_mmd(
+            f"ENVIRONMENT: {env_name.upper()} - PART {index} OF {len(partitions)}",
+            part_sections, part_connections[index], notes)
+
+    overview = ["flowchart LR", f'\nsubgraph "ENVIRONMENT: {env_name.upper()} - OVERVIEW"', "    direction LR"]
+    for index, members in enumerate(partitions, start=1):
+        counts = {}
+        for node_id in members:
+            counts[node_section[node_id].strip("'")] = counts.get(node_section[node_id].strip("'"), 0) + 1
+        summary = ", ".join(f"{count} {section}" for section, count in sorted(counts.items()))
+        overview.append(f'    part_{index}["Part {index}<br/>{len(members)} resources<br/>{summary}"]')
+    for (src_part, dst_part), count in sorted(cross_links.items()):
+        overview.append(f'    part_{src_part} -->|"{count}"| part_{dst_part}')
+    overview.append("end")
+    for index in range(1, len(partitions) + 1):
+        overview.append(f'click part_{index} "./{env_name}-diagram-part-{index}.mmd" "Open part {index}"')
+    files[main_file] = "\n".join(overview)
+    return files
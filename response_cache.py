@@ -0,0 +1,217 @@
+# response_cache.py
+"""
+Warm-container response cache for read-only AWS calls.
+
+Scheduled runs often land on a warm container, and slow-changing data (IAM
+roles and policies, Cognito pools, VPC route tables) would otherwise be
+fetched in full every time. Parsed responses are kept in Lambda /tmp, keyed
+by account, region, service, operation and request parameters, and served
+back through botocore's before-call hook - collectors need no changes.
+
+Only services/operations with a TTL are cached, and only Describe*/List*/Get*
+calls. Pages of a paginated call are cached individually; as every page of a
+chain is written in order, expiry and eviction always drop the first page
+first, so a cached chain is never resumed against a live token.
+"""
+import os
+import json
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+import functools
+import contextvars
+
+RESPONSE_CACHE_DIR = os.environ.get('RESPONSE_CACHE_DIR', '/tmp/aws-response-cache')
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+RESPONSE_CACHE_MAX_MB = int(os.environ.get('RESPONSE_CACHE_MAX_MB', '256'))
+
+# Seconds per service, or per "service.Operation" for finer control.
+DEFAULT_RESPONSE_CACHE_TTLS = {
+    'iam': 24 * 3600,
+    'cognito-idp': 6 * 3600,
+    'ec2.DescribeVpcs': 6 * 3600,
+    'ec2.DescribeSubnets': 6 * 3600,
+    'ec2.DescribeRouteTables': 6 * 3600,
+    'ecs': 15 * 60,
+}
+
+
+def _load_ttls():
+    ttls = dict(DEFAULT_RESPONSE_CACHE_TTLS)
+    raw = os.environ.get('RESPONSE_CACHE_TTLS')
+    if raw:
+        try:
+            ttls.update({str(k): int(v) for k, v in json.loads(raw).items()})
+        except (ValueError, TypeError, AttributeError) as e:
+            print(f"WARN: ignoring invalid RESPONSE_CACHE_TTLS ({e}); using defaults.")
+    return {k: v for k, v in ttls.items() if v > 0}
+
+
+RESPONSE_CACHE_TTLS = _load_ttls()
+_READ_PREFIXES = ('Describe', 'List', 'Get')
+
+
+class ResponseCacheStats:
+    """Hit/miss counters for ONE invocation (see start_response_cache)."""
+
+    def __init__(self, refresh=False):
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def count(self, field, amount=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def summary(self):
+        lookups = self.hits + self.misses
+        rate = f"{100 * self.hits / lookups:.0f}%" if lookups else "n/a"
+        mode = " (refresh: reads bypassed)" if self.refresh else ""
+        return (f"Response cache{mode}: {self.hits} hits, {self.misses} misses ({rate} hit rate), "
+                f"{self.writes} writes, {self.evictions} evictions.")
+
+
+_CURRENT_STATS = contextvars.ContextVar('response_cache_stats', default=None)
+_ACCOUNT = {}
+_SIZE = {}
+_LOCK = threading.Lock()
+
+
+def start_response_cache(refresh=False):
+    """Enables the cache for the current invocation. refresh=True ignores
+    cached entries but still stores fresh responses. Returns the run's stats,
+    or None when the cache is switched off."""
+    stats = ResponseCacheStats(refresh) if RESPONSE_CACHE_ENABLED and RESPONSE_CACHE_TTLS else None
+    _CURRENT_STATS.set(stats)
+    return stats
+
+
+def _ttl_for(service_name, operation_name):
+    if not operation_name.startswith(_READ_PREFIXES):
+        return None
+    return RESPONSE_CACHE_TTLS.get(f"{service_name}.{operation_name}", RESPONSE_CACHE_TTLS.get(service_name))
+
+
+def _account_id():
+    """The caller's account, looked up once per container."""
+    if 'id' not in _ACCOUNT:
+        from utils import get_client
+        try:
+            _ACCOUNT['id'] = get_client('sts').get_caller_identity()['Account']
+        except Exception as e:
+            print(f"WARN: response cache disabled, could not resolve the account id: {e}")
+            _ACCOUNT['id'] = None
+    return _ACCOUNT['id']
+
+
+def _path_for(key):
+    return os.path.join(RESPONSE_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + '.pkl')
+
+
+def _cache_size():
+    """Bytes currently in the cache directory, scanned once per container
+    and then tracked incrementally."""
+    if 'bytes' not in _SIZE:
+        total = 0
+        if os.path.isdir(RESPONSE_CACHE_DIR):
+            total = sum(entry.stat().st_size for entry in os.scandir(RESPONSE_CACHE_DIR) if entry.is_file())
+        _SIZE['bytes'] = total
+    return _SIZE['bytes']
+
+
+def _evict(stats):
+    """Drops the oldest entries until the cache is back under 90% of its budget."""
+    budget = RESPONSE_CACHE_MAX_MB * 1024 * 1024
+    if _cache_size() <= budget:
+        return
+    entries = sorted((e for e in os.scandir(RESPONSE_CACHE_DIR) if e.is_file()), key=lambda e: e.stat().st_mtime)
+    for entry in entries:
+        if _SIZE['bytes'] <= budget * 0.9:
+            break
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+        except OSError:
+            continue
+        _SIZE['bytes'] -= size
+        stats.count('evictions')
+
+
+def _remember_params(service_name, client, params, model, context, **kwargs):
+    """before-parameter-build: derive the cache key from the API parameters."""
+    stats = _CURRENT_STATS.get()
+    ttl = _ttl_for(service_name, model.name) if stats is not None else None
+    if ttl is None or model.has_streaming_output:
+        return
+    account = _account_id()
+    if account is None:
+        return
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    context['response_cache'] = {
+        'key': f"{account}|{client.meta.region_name}|{service_name}|{model.name}|{digest}",
+        'ttl': ttl,
+    }
+
+
+class _CachedHTTPResponse:
+    """Stands in for the HTTP response of a call answered from the cache."""
+    status_code = 200
+    headers = {}
+    content = b''
+
+
+def _serve_from_cache(context, **kwargs):
+    """before-call: return (http_response, parsed) to short-circuit the request."""
+    entry = context.get('response_cache')
+    stats = _CURRENT_STATS.get()
+    if not entry or stats is None:
+        return None
+    if not stats.refresh:
+        path = _path_for(entry['key'])
+        try:
+            if time.time() - os.path.getmtime(path) < entry['ttl']:
+                with open(path, 'rb') as f:
+                    parsed = pickle.load(f)
+                stats.count('hits')
+                entry['hit'] = True
+                return _CachedHTTPResponse(), parsed
+        except (OSError, pickle.PickleError, EOFError):
+            pass
+    stats.count('misses')
+    return None
+
+
+def _store_response(http_response, parsed, context, **kwargs):
+    """after-call: persist a successful live response."""
+    entry = context.get('response_cache')
+    stats = _CURRENT_STATS.get()
+    if not entry or entry.get('hit') or stats is None or http_response.status_code >= 300:
+        return
+    try:
+        os.makedirs(RESPONSE_CACHE_DIR, exist_ok=True)
+        payload = pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL)
+        path = _path_for(entry['key'])
+        fd, tmp_path = tempfile.mkstemp(dir=RESPONSE_CACHE_DIR)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        with _LOCK:
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            _SIZE['bytes'] = _cache_size() + len(payload) - previous
+            _evict(stats)
+        stats.count('writes')
+    except (OSError, pickle.PickleError, TypeError) as e:
+        print(f"WARN: could not cache {entry['key'].split('|')[3]} response: {e}")
+
+
+def attach(client, service_name):
+    """Registers the cache hooks on a newly created client."""
+    events = client.meta.events
+    events.register('before-parameter-build', functools.partial(_remember_params, service_name, client))
+    events.register('before-call', _serve_from_cache)
+    events.register('after-call', _store_response)
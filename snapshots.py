@@ -0,0 +1,97 @@
+# snapshots.py
+"""
+Per-collector result snapshots in S3 (snapshots/{collector}.json).
+
+Services change at very different rates, so each collector has a maximum
+age (collectors/registry.py). A run re-executes only collectors whose last
+stored result is older than that, and loads the rest from here before
+categorisation and rendering. Collectors that do run may also consult their
+previous snapshot via previous_snapshot() to avoid refetching unchanged data.
+"""
+import os
+import json
+import threading
+import contextvars
+
+from utils import get_client
+
+SNAPSHOT_PREFIX = 'snapshots/'
+COLLECTOR_SNAPSHOTS = os.environ.get('COLLECTOR_SNAPSHOTS', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+
+class SnapshotStore:
+    """Snapshot access for ONE invocation. Modification times come from a
+    single listing; snapshot bodies are fetched only when actually used."""
+
+    def __init__(self, bucket, refresh=False):
+        self.bucket = bucket
+        self.refresh = refresh
+        self._modified = None
+        self.available = True
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _last_modified(self):
+        if self._modified is None:
+            modified = {}
+            try:
+                paginator = get_client('s3').get_paginator('list_objects_v2')
+                for page in paginator.paginate(Bucket=self.bucket, Prefix=SNAPSHOT_PREFIX):
+                    for obj in page.get('Contents', []):
+                        name = obj['Key'][len(SNAPSHOT_PREFIX):].rsplit('.json', 1)[0]
+                        modified[name] = obj['LastModified']
+            except Exception as e:
+                print(f"WARN: could not list collector snapshots, running every collector without saving: {e}")
+                self.available = False
+            self._modified = modified
+        return self._modified
+
+    def is_fresh(self, name, max_age, now):
+        """True if the stored result is younger than max_age seconds."""
+        if self.refresh or not max_age:
+            return False
+        modified = self._last_modified().get(name)
+        return modified is not None and (now - modified).total_seconds() < max_age
+
+    def load(self, name):
+        """{'collected_at': iso str, 'data': {...}, 'audit': {...}} or None."""
+        with self._lock:
+            if name not in self._loaded:
+                snapshot = None
+                if name in self._last_modified():
+                    try:
+                        body = get_client('s3').get_object(Bucket=self.bucket, Key=f"{SNAPSHOT_PREFIX}{name}.json")['Body'].read()
+                        snapshot = json.loads(body)
+                    except Exception as e:
+                        print(f"WARN: could not load the {name} snapshot: {e}")
+                self._loaded[name] = snapshot
+            return self._loaded[name]
+
+    def save(self, name, data, collected_at, audit=None):
+        """audit: the EnvAudit counters the collector added, replayed when
+        the snapshot is reused."""
+        if not self.available:
+            return
+        payload = json.dumps({'collected_at': collected_at, 'data': data, 'audit': audit or {}}, default=str)
+        try:
+            get_client('s3').put_object(Body=payload, Bucket=self.bucket, Key=f"{SNAPSHOT_PREFIX}{name}.json")
+        except Exception as e:
+            print(f"WARN: could not save the {name} snapshot: {e}")
+
+
+_CURRENT_STORE = contextvars.ContextVar('snapshot_store', default=None)
+
+
+def start_snapshot_store(bucket, refresh=False, enabled=True):
+    """Sets (or, when disabled, clears) the store for this invocation."""
+    store = SnapshotStore(bucket, refresh) if enabled and COLLECTOR_SNAPSHOTS else None
+    _CURRENT_STORE.set(store)
+    return store
+
+
+def previous_snapshot(name):
+    """The collector's data from its last stored run, or None (always None
+    for a {"refresh": true} run, which collects everything live)."""
+    store = _CURRENT_STORE.get()
+    snapshot = store.load(name) if store and not store.refresh else None
+    return snapshot['data'] if snapshot else None
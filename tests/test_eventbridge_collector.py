@@ -0,0 +1,82 @@
+# tests/test_eventbridge_collector.py
+"""
+Runs the EventBridge collector end to end against a Stubber: buses are paged
+by NextToken (list_event_buses has no boto3 paginator), then each bus's rules
+and their targets are expanded.
+"""
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import utils
+from collectors import eventbridge_collector
+
+ACCOUNT = 'arn:aws:events:us-east-1:123456789012'
+
+
+@pytest.fixture
+def events(monkeypatch):
+    client = boto3.client('events', region_name='us-east-1',
+                          aws_access_key_id='test', aws_secret_access_key='test')
+    monkeypatch.setattr(eventbridge_collector, 'get_client', lambda name: client)
+    # One worker keeps the stubbed calls in a fixed order.
+    monkeypatch.setattr(eventbridge_collector, 'EVENTBRIDGE_TARGET_WORKERS', 1)
+    monkeypatch.setattr(utils, 'SKIP_TAG_LOOKUPS', True)
+    with Stubber(client) as stubber:
+        try:
+            yield stubber
+        finally:
+            utils.start_env_scope(None)
+        stubber.assert_no_pending_responses()
+
+
+def test_pages_buses_and_expands_rule_targets(events):
+    events.add_response('list_event_buses', {
+        'EventBuses': [{'Name': 'default', 'Arn': f'{ACCOUNT}:event-bus/default'}], 'NextToken': 'page-2',
+    }, {})
+    events.add_response('list_rules', {'Rules': [
+        {'Name': 'nightly-prod', 'Arn': f'{ACCOUNT}:rule/nightly-prod', 'State': 'ENABLED',
+         'ScheduleExpression': 'rate(1 day)'},
+    ]}, {'EventBusName': 'default'})
+    events.add_response('list_targets_by_rule', {'Targets': [
+        {'Id': 'worker', 'Arn': 'arn:aws:lambda:us-east-1:123456789012:function:worker-prod'},
+    ]}, {'Rule': 'nightly-prod', 'EventBusName': 'default'})
+    events.add_response('list_event_buses', {
+        'EventBuses': [{'Name': 'orders-dev', 'Arn': f'{ACCOUNT}:event-bus/orders-dev'}],
+    }, {'NextToken': 'page-2'})
+    events.add_response('list_rules', {'Rules': []}, {'EventBusName': 'orders-dev'})
+
+    data = eventbridge_collector.get_eventbridge_data()
+
+    default_bus, orders_bus = data['event_buses']
+    assert default_bus['Environment'] == utils.DEFAULT_ENV
+    rule, = default_bus['Rules']
+    assert rule['Environment'] == 'prod'
+    assert rule['ScheduleExpression'] == 'rate(1 day)'
+    assert rule['Targets'] == [{'Id': 'worker', 'Arn': 'arn:aws:lambda:us-east-1:123456789012:function:worker-prod'}]
+    assert (orders_bus['Name'], orders_bus['Environment'], orders_bus['Rules']) == ('orders-dev', 'dev', [])
+
+
+def test_scoped_run_scopes_rules_not_buses(events, monkeypatch):
+    # The untagged 'default' bus matches no environment, but a rule on it
+    # tagged prod is still documented in a prod-scoped run. Its tags come
+    # from the scope's tag index: the only list_tags_for_resource is the bus's.
+    monkeypatch.setattr(utils, 'SKIP_TAG_LOOKUPS', False)
+    utils.start_env_scope(['prod'], {('events', 'sync'): [{'Key': 'Environment', 'Value': 'prod'}]})
+    events.add_response('list_event_buses', {
+        'EventBuses': [{'Name': 'default', 'Arn': f'{ACCOUNT}:event-bus/default'}],
+    }, {})
+    events.add_response('list_tags_for_resource', {'Tags': []}, {'ResourceARN': f'{ACCOUNT}:event-bus/default'})
+    events.add_response('list_rules', {'Rules': [
+        {'Name': 'cleanup-dev', 'Arn': f'{ACCOUNT}:rule/cleanup-dev', 'State': 'ENABLED'},
+        {'Name': 'sync', 'Arn': f'{ACCOUNT}:rule/sync', 'State': 'ENABLED', 'EventPattern': '{}'},
+    ]}, {'EventBusName': 'default'})
+    # Only the in-scope rule's targets are fetched.
+    events.add_response('list_targets_by_rule', {'Targets': [
+        {'Id': 'queue', 'Arn': 'arn:aws:sqs:us-east-1:123456789012:sync-jobs'},
+    ]}, {'Rule': 'sync', 'EventBusName': 'default'})
+
+    data = eventbridge_collector.get_eventbridge_data()
+
+    bus, = data['event_buses']
+    assert [(rule['Name'], rule['Environment']) for rule in bus['Rules']] == [('sync', 'prod')]
@@ -0,0 +1,94 @@
+# tests/test_requested_fields.py
+"""
+Pins the fields each collector asks AWS for (see user-040): a Stubber
+rejects any call whose parameters differ from the expected ones, so widening
+a request (more SQS attributes, shard listings, per-node detail) fails here.
+"""
+import datetime
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+
+import utils
+from collectors import elasticache_collector, queues_collector
+
+
+def _client(service_name):
+    return boto3.client(service_name, region_name='us-east-1',
+                        aws_access_key_id='test', aws_secret_access_key='test')
+
+
+@pytest.fixture(autouse=True)
+def _no_tag_lookups(monkeypatch):
+    # Tag calls are separate permissions and not what these tests pin.
+    monkeypatch.setattr(utils, 'SKIP_TAG_LOOKUPS', True)
+
+
+def test_queues_collector_requests_only_rendered_fields(monkeypatch):
+    # Type, message count and the ARN used to resolve EventBridge targets.
+    assert queues_collector.SQS_QUEUE_ATTRIBUTES == ['ApproximateNumberOfMessages', 'FifoQueue', 'QueueArn']
+    # Only the first destination is rendered.
+    assert queues_collector.FIREHOSE_DESTINATION_LIMIT == 1
+    clients = {name: _client(name) for name in ('sqs', 'kinesis', 'firehose')}
+    monkeypatch.setattr(queues_collector, 'get_client', lambda name: clients[name])
+    queue_url = 'https://sqs.us-east-1.amazonaws.com/123456789012/orders-prod'
+
+    with Stubber(clients['sqs']) as sqs, Stubber(clients['kinesis']) as kinesis, \
+            Stubber(clients['firehose']) as firehose:
+        sqs.add_response('list_queues', {'QueueUrls': [queue_url]}, {})
+        sqs.add_response('get_queue_attributes',
+                         {'Attributes': {'ApproximateNumberOfMessages': '3', 'FifoQueue': 'false'}},
+                         {'QueueUrl': queue_url, 'AttributeNames': queues_collector.SQS_QUEUE_ATTRIBUTES})
+
+        kinesis.add_response('list_streams', {'StreamNames': ['clicks-prod'], 'HasMoreStreams': False}, {})
+        kinesis.add_response('describe_stream_summary', {'StreamDescriptionSummary': {
+            'StreamName': 'clicks-prod',
+            'StreamARN': 'arn:aws:kinesis:us-east-1:123456789012:stream/clicks-prod',
+            'StreamStatus': 'ACTIVE', 'RetentionPeriodHours': 24,
+            'StreamCreationTimestamp': datetime.datetime(2024, 1, 1),
+            'EnhancedMonitoring': [], 'OpenShardCount': 4,
+        }}, {'StreamName': 'clicks-prod'})
+
+        firehose.add_response('list_delivery_streams',
+                              {'DeliveryStreamNames': ['audit-prod'], 'HasMoreDeliveryStreams': False}, {})
+        firehose.add_response('describe_delivery_stream', {'DeliveryStreamDescription': {
+            'DeliveryStreamName': 'audit-prod',
+            'DeliveryStreamARN': 'arn:aws:firehose:us-east-1:123456789012:deliverystream/audit-prod',
+            'DeliveryStreamStatus': 'ACTIVE', 'DeliveryStreamType': 'DirectPut', 'VersionId': '1',
+            'Destinations': [{'DestinationId': 'd-1', 'S3DestinationDescription': {
+                'RoleARN': 'arn:aws:iam::123456789012:role/firehose', 'BucketARN': 'arn:aws:s3:::audit',
+                'BufferingHints': {}, 'CompressionFormat': 'UNCOMPRESSED', 'EncryptionConfiguration': {},
+            }}],
+            'HasMoreDestinations': False,
+        }}, {'DeliveryStreamName': 'audit-prod', 'Limit': queues_collector.FIREHOSE_DESTINATION_LIMIT})
+
+        data = queues_collector.get_queues_data()
+
+        sqs.assert_no_pending_responses()
+        kinesis.assert_no_pending_responses()
+        firehose.assert_no_pending_responses()
+
+    assert data['sqs_queues'][0]['MessageCount'] == '3'
+    assert data['kinesis_streams'][0]['Shards'] == 4
+    assert data['firehose_streams'][0]['Destination'] == 'S3'
+
+
+def test_elasticache_collector_omits_cache_node_info(monkeypatch):
+    client = _client('elasticache')
+    monkeypatch.setattr(elasticache_collector, 'get_client', lambda name: client)
+
+    with Stubber(client) as elasticache:
+        elasticache.add_response('describe_replication_groups', {'ReplicationGroups': []}, {})
+        # Expected params of {} fail the call if ShowCacheNodeInfo is passed.
+        elasticache.add_response('describe_cache_clusters', {'CacheClusters': [{
+            'CacheClusterId': 'sessions-prod', 'Engine': 'memcached', 'CacheNodeType': 'cache.t3.micro',
+            'CacheClusterStatus': 'available',
+            'ConfigurationEndpoint': {'Address': 'sessions-prod.cfg.cache.amazonaws.com', 'Port': 11211},
+        }]}, {})
+
+        data = elasticache_collector.get_elasticache_data()
+
+        elasticache.assert_no_pending_responses()
+
+    assert data['clusters'][0]['Endpoint'] == 'sessions-prod.cfg.cache.amazonaws.com'
@@ -2,19 +2,134 @@
 import os
 import re
 import json
-import boto3
-from botocore.config import Config
+import time
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+import response_cache
+
+# boto3/botocore are imported on first use rather than at module import: they
+# are the bulk of this package's import time, and a fast dry run or a run
+# with few collectors enabled should not pay for models it never loads.
 
 # Shared retry config for all collectors: 'adaptive' mode backs off automatically
 # when it detects throttling, instead of letting a single ThrottlingException
 # bubble up as an unhandled ClientError and take down the whole collection run.
-BOTO_CONFIG = Config(retries={'max_attempts': 8, 'mode': 'adaptive'})
+BOTO_RETRIES = {'max_attempts': 8, 'mode': 'adaptive'}
+
+# Comma-separated services whose clients are created during the Lambda init
+# phase (e.g. "s3,ec2,lambda"), so model loading happens before the first
+# invocation is timed. Empty disables the warm-up.
+WARM_CLIENTS = os.environ.get('WARM_CLIENTS', '')
+
+_SESSION = None
+_BOTO_CONFIG = None
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_session():
+    """One boto3 session per container. Its botocore loader caches every
+    service model it parses, so each model is read once per container."""
+    global _SESSION, _BOTO_CONFIG
+    if _SESSION is None:
+        import boto3
+        from botocore.config import Config
+        _BOTO_CONFIG = Config(retries=BOTO_RETRIES)
+        _SESSION = boto3.session.Session()
+    return _SESSION
 
 
 def get_client(service_name, **kwargs):
     """Returns a boto3 client pre-configured with adaptive retry/backoff.
-    Collectors should use this instead of calling boto3.client() directly."""
-    return boto3.client(service_name, config=BOTO_CONFIG, **kwargs)
+    Collectors should use this instead of calling boto3.client() directly.
+
+    Clients are created once per (service, kwargs) and reused for the life of
+    the container; boto3 clients are thread-safe, but creating them from the
+    shared session is not, hence the lock."""
+    key = (service_name, tuple(sorted(kwargs.items())))
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                session = _get_session()
+                client = session.client(service_name, config=_BOTO_CONFIG, **kwargs)
+                response_cache.attach(client, service_name)
+                _CLIENTS[key] = client
+    return client
+
+
+def paginate(client, operation, result_key, **kwargs):
+    """Yields every item of a list call, through boto3's paginator when it has
+    one, otherwise by following NextToken (e.g. events.list_event_buses)."""
+    if client.can_paginate(operation):
+        for page in client.get_paginator(operation).paginate(**kwargs):
+            yield from page.get(result_key, [])
+        return
+    while True:
+        page = getattr(client, operation)(**kwargs)
+        yield from page.get(result_key, [])
+        if not page.get('NextToken'):
+            return
+        kwargs['NextToken'] = page['NextToken']
+
+
+# Upper bound on the worker threads a collector uses for per-resource calls.
+COLLECTOR_MAX_WORKERS = int(os.environ.get('COLLECTOR_MAX_WORKERS', '8'))
+
+
+def parallel_map(fn, items, max_workers=None):
+    """Runs fn over items on a thread pool and returns the results in order.
+
+    Each task runs in a copy of the caller's context, so the per-invocation
+    audit, environment scope and response-cache stats (all context vars) are
+    visible from the worker threads. The first exception is re-raised, as it
+    would be from a plain loop."""
+    items = list(items)
+    workers = min(max_workers or COLLECTOR_MAX_WORKERS, len(items))
+    if workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+class RateLimiter:
+    """Spaces calls at most `rate` per second across all threads sharing it,
+    for per-resource APIs with a low per-account request rate."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def warm_clients(services):
+    """Creates the listed clients ahead of time (see WARM_CLIENTS). A client
+    that cannot be created here is simply created again on first use."""
+    if isinstance(services, str):
+        services = services.split(',')
+    for service_name in services:
+        service_name = service_name.strip()
+        if not service_name:
+            continue
+        try:
+            get_client(service_name)
+        except Exception as e:
+            print(f"WARN: could not warm the {service_name} client: {e}")
 
 
 # ---------------------------------------------------------------------------
@@ -96,60 +211,90 @@ ENV_ALIASES, ENV_TAG_KEYS, ENV_PRIORITY = _load_overrides()
 # (faster / fewer calls, but falls back to name-based guessing only).
 SKIP_TAG_LOOKUPS = os.environ.get('SKIP_TAG_LOOKUPS', '').lower() in ('1', 'true', 'yes')
 
-# Audit trail of every categorisation decision, used by the dry-run mode so you
-# can eyeball how names/tags were interpreted before trusting a full report.
-ENV_AUDIT = []
-
-
-def _tokenize(text):
-    """Splits a resource name into comparable whole tokens.
-
-    Handles camelCase ('prodApiHandler' -> prod, api, handler) and strips
-    trailing digits ('prod01' -> prod), so matching is on whole words rather
-    than substrings. This is what stops 'producer-service' matching 'prod'
-    and 'latest-logs' matching 'test'.
-    """
-    if not text:
-        return []
-    s = re.sub(r'(?<=[a-z0-9])(?=[A-Z])', ' ', str(text))
-    raw = [t for t in re.split(r'[^A-Za-z0-9]+', s.lower()) if t]
-    tokens = []
-    for t in raw:
-        stripped = re.sub(r'\d+$', '', t)
-        tokens.append(stripped if stripped else t)
-    return tokens
-
+class EnvAudit:
+    """Audit trail of the categorisation decisions made during ONE invocation.
 
-def _match_tokens(tokens):
-    """Returns every canonical environment found in the token list.
+    A fresh instance is started per invocation (see start_env_audit), so a warm
+    Lambda container no longer accumulates entries from earlier runs. Recording
+    is lock-protected so collectors may categorise from worker threads.
 
-    Adjacent tokens are joined and tested first (greedy), so 'pre-prod-db'
-    matches 'preprod' rather than matching 'prod' and being mislabelled as
-    production.
+    detailed=False keeps only the counters - enough for the run summary - and
+    drops the per-resource entries that only the dry-run review sheet needs.
     """
-    matches = []
-    i = 0
-    while i < len(tokens):
-        if i + 1 < len(tokens):
-            pair = tokens[i] + tokens[i + 1]
-            if pair in ENV_ALIASES:
-                matches.append(ENV_ALIASES[pair])
-                i += 2
-                continue
-        if tokens[i] in ENV_ALIASES:
-            matches.append(ENV_ALIASES[tokens[i]])
-        i += 1
-    return matches
 
-
-def _pick(matches):
-    """Resolves multiple matches using the explicit priority order."""
-    if not matches:
-        return None
-    for env in ENV_PRIORITY:
-        if env in matches:
-            return env
-    return matches[0]
+    def __init__(self, detailed=False):
+        self.detailed = detailed
+        self.entries = []
+        self.total = 0
+        self.by_tag = 0
+        self.by_name = 0
+        self.ambiguous = 0
+        self.env_counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, details):
+        source = details['source']
+        with self._lock:
+            self.total += 1
+            if source.startswith('tag:'):
+                self.by_tag += 1
+            elif source == 'name':
+                self.by_name += 1
+            if details.get('ambiguous'):
+                self.ambiguous += 1
+            env = details['environment']
+            self.env_counts[env] = self.env_counts.get(env, 0) + 1
+            if self.detailed:
+                self.entries.append({
+                    'name': str(name),
+                    'environment': env,
+                    'source': source,
+                    'ambiguous': details.get('ambiguous', False),
+                    'all_matches': details.get('all_matches'),
+                })
+
+    @property
+    def uncategorized(self):
+        return self.env_counts.get(DEFAULT_ENV, 0)
+
+    def counts(self):
+        """The counters alone, e.g. to store alongside a collector snapshot."""
+        with self._lock:
+            return {'total': self.total, 'by_tag': self.by_tag, 'by_name': self.by_name,
+                    'ambiguous': self.ambiguous, 'env_counts': dict(self.env_counts)}
+
+    def merge(self, counts):
+        """Adds counters saved by counts() - how a reused snapshot's resources
+        are still counted without detecting their environments again."""
+        with self._lock:
+            for key in ('total', 'by_tag', 'by_name', 'ambiguous'):
+                setattr(self, key, getattr(self, key) + counts.get(key, 0))
+            for env, count in counts.get('env_counts', {}).items():
+                self.env_counts[env] = self.env_counts.get(env, 0) + count
+
+
+_CURRENT_AUDIT = contextvars.ContextVar('env_audit', default=None)
+
+
+def start_env_audit(detailed=False):
+    """Starts a new audit for the current invocation, replacing the previous
+    one. Pass detailed=True when the dry-run sheet needs every entry."""
+    audit = EnvAudit(detailed=detailed)
+    _CURRENT_AUDIT.set(audit)
+    return audit
+
+
+def current_env_audit():
+    """Returns the audit for the current invocation, or None outside a run."""
+    return _CURRENT_AUDIT.get()
+
+
+def replay_environment(name, environment, source='snapshot'):
+    """Records an environment kept from a previous run, so resources that
+    skip detection are still counted by the audit."""
+    audit = _CURRENT_AUDIT.get()
+    if audit is not None:
+        audit.record(name, {'environment': environment, 'source': source})
 
 
 def _normalize_tags(tags):
@@ -174,51 +319,138 @@ def _normalize_tags(tags):
     return items
 
 
-def get_environment_details(name, tags=None):
-    """Determines a resource's environment, returning the decision and how it
-    was reached. Tags always win over the name; the name is only a fallback."""
-    # 1. Tags are authoritative when present.
-    for key, value in _normalize_tags(tags):
-        if key.lower() in ENV_TAG_KEYS:
+# Compiled once at import instead of on every call; detection runs for every
+# resource name and tag value, and the same names repeat heavily across a run.
+_CAMEL_BOUNDARY = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_TRAILING_DIGITS = '0123456789'
+
+ENV_DETECTION_CACHE_SIZE = int(os.environ.get('ENV_DETECTION_CACHE_SIZE', '16384'))
+
+
+class EnvDetector:
+    """Environment-detection engine compiled once from the alias, priority and
+    tag-key configuration.
+
+    Results are memoised in a bounded LRU cache keyed by the name plus only the
+    environment-relevant tags, so repeated names/tag values cost a dict lookup.
+    """
+
+    def __init__(self, aliases, priority, tag_keys, cache_size=ENV_DETECTION_CACHE_SIZE):
+        self.aliases = dict(aliases)
+        self.tag_keys = frozenset(tag_keys)
+        self._rank = {env: i for i, env in enumerate(priority)}
+        # Every prefix of every alias. Joining tokens left-to-right can stop
+        # as soon as the joined string is no longer a prefix of any alias,
+        # which generalises the old two-token lookahead to any span length.
+        self._prefixes = {alias[:i] for alias in self.aliases for i in range(1, len(alias) + 1)}
+        self._detect = functools.lru_cache(maxsize=cache_size)(self._detect_uncached)
+
+    def tokenize(self, text):
+        """Splits a resource name into comparable whole tokens.
+
+        Handles camelCase ('prodApiHandler' -> prod, api, handler) and strips
+        trailing digits ('prod01' -> prod), so matching is on whole words rather
+        than substrings. This is what stops 'producer-service' matching 'prod'
+        and 'latest-logs' matching 'test'.
+        """
+        if not text:
+            return []
+        s = _CAMEL_BOUNDARY.sub(' ', str(text)).lower()
+        return [t.rstrip(_TRAILING_DIGITS) or t for t in _NON_ALNUM.split(s) if t]
+
+    def match_tokens(self, tokens):
+        """Returns every canonical environment found in the token list.
+
+        At each position the longest run of adjacent tokens that joins into an
+        alias wins, so 'pre-prod-db' matches 'preprod' rather than matching
+        'prod' and being mislabelled as production.
+        """
+        matches = []
+        aliases, prefixes = self.aliases, self._prefixes
+        i, n = 0, len(tokens)
+        while i < n:
+            joined, best, best_end = '', None, i + 1
+            for j in range(i, n):
+                joined += tokens[j]
+                if joined not in prefixes:
+                    break
+                if joined in aliases:
+                    best, best_end = aliases[joined], j + 1
+            if best is not None:
+                matches.append(best)
+            i = best_end
+        return matches
+
+    def pick(self, matches):
+        """Resolves multiple matches using the explicit priority order."""
+        if not matches:
+            return None
+        ranked = [m for m in matches if m in self._rank]
+        if ranked:
+            return min(ranked, key=self._rank.__getitem__)
+        return matches[0]
+
+    def details(self, name, tags=None):
+        """Cached equivalent of get_environment_details."""
+        env_tags = tuple((k, v) for k, v in _normalize_tags(tags) if k.lower() in self.tag_keys)
+        return dict(self._detect(str(name), env_tags))
+
+    def cache_info(self):
+        return self._detect.cache_info()
+
+    def _detect_uncached(self, name, env_tags):
+        # 1. Tags are authoritative when present.
+        for key, value in env_tags:
             # Run the VALUE through the same alias/token logic, so a resource
             # tagged Environment=Production or Environment=Pre-Prod is
             # recognised instead of silently falling through to name-guessing
             # (which the previous exact-match version did).
-            env = _pick(_match_tokens(_tokenize(value)))
+            env = self.pick(self.match_tokens(self.tokenize(value)))
             if env:
                 return {'environment': env, 'source': f'tag:{key}={value}', 'ambiguous': False}
 
-    # 2. Fall back to the resource name.
-    matches = _match_tokens(_tokenize(name))
-    env = _pick(matches)
-    if env:
-        distinct = set(matches)
-        return {
-            'environment': env,
-            'source': 'name',
-            'ambiguous': len(distinct) > 1,
-            'all_matches': sorted(distinct) if len(distinct) > 1 else None,
-        }
+        # 2. Fall back to the resource name.
+        matches = self.match_tokens(self.tokenize(name))
+        env = self.pick(matches)
+        if env:
+            distinct = set(matches)
+            return {
+                'environment': env,
+                'source': 'name',
+                'ambiguous': len(distinct) > 1,
+                'all_matches': sorted(distinct) if len(distinct) > 1 else None,
+            }
 
-    return {'environment': DEFAULT_ENV, 'source': 'default', 'ambiguous': False}
+        return {'environment': DEFAULT_ENV, 'source': 'default', 'ambiguous': False}
 
 
-def get_environment_from_name(name, tags=None):
-    """Backwards-compatible wrapper used by all collectors."""
-    details = get_environment_details(name, tags)
-    ENV_AUDIT.append({
-        'name': str(name),
-        'environment': details['environment'],
-        'source': details['source'],
-        'ambiguous': details.get('ambiguous', False),
-        'all_matches': details.get('all_matches'),
-    })
+ENV_DETECTOR = EnvDetector(ENV_ALIASES, ENV_PRIORITY, ENV_TAG_KEYS)
+
+
+def get_environment_details(name, tags=None):
+    """Determines a resource's environment, returning the decision and how it
+    was reached. Tags always win over the name; the name is only a fallback."""
+    return ENV_DETECTOR.details(name, tags)
+
+
+def record_environment(name, details):
+    """Records a get_environment_details decision in the run's audit, noting
+    ambiguous matches; returns the environment."""
+    audit = _CURRENT_AUDIT.get()
+    if audit is not None:
+        audit.record(name, details)
     if details.get('ambiguous'):
         print(f"NOTE: '{name}' matched multiple environments {details.get('all_matches')}; "
               f"resolved to '{details['environment']}' by priority order.")
     return details['environment']
 
 
+def get_environment_from_name(name, tags=None):
+    """Backwards-compatible wrapper used by all collectors."""
+    return record_environment(name, get_environment_details(name, tags))
+
+
 def safe_tags(fetch_fn, description):
     """Runs a per-resource tag lookup, swallowing failures.
 
@@ -233,3 +465,91 @@ def safe_tags(fetch_fn, description):
     except Exception as e:
         print(f"WARN: could not fetch tags for {description}: {e}")
         return None
+
+
+# --- ARNs ---
+# Services whose ARNs carry no resource-type prefix ("arn:aws:sqs:r:a:queue").
+_UNTYPED_ARN_SERVICES = ('sqs', 'sns', 's3')
+
+
+def arn_key(arn):
+    """(service, resource id) for an ARN, e.g. ('dynamodb', 'orders') for
+    arn:aws:dynamodb:...:table/orders. None if the string is not an ARN."""
+    parts = str(arn).split(':', 5)
+    if len(parts) < 6 or parts[0] != 'arn':
+        return None
+    service, resource = parts[2], parts[5]
+    if service not in _UNTYPED_ARN_SERVICES:
+        separator = min((i for i in (resource.find('/'), resource.find(':')) if i >= 0), default=-1)
+        resource = resource[separator + 1:] if separator >= 0 else resource
+    return service, resource
+
+
+# --- Environment scope ---
+# Services the Resource Groups Tagging API does not cover; for these an
+# absent index entry says nothing about the resource's tags.
+_UNINDEXED_TAG_SERVICES = ('iam',)
+
+
+class EnvScope:
+    """The environments requested for ONE invocation, e.g. {"environments": ["prod"]}.
+
+    Membership is pre-resolved from the name plus the bulk tag index (one
+    tagging-API sweep, see collectors.inventory_collector.get_tag_index), so
+    collectors can skip their expensive per-resource calls for resources that
+    will not be rendered. When a resource's tags are unknown - no index, or a
+    service the index does not cover - a name that matches no environment is
+    kept, since its real tags might still place it in scope.
+    """
+
+    def __init__(self, environments, tag_index=None):
+        self.environments = frozenset(environments)
+        self.tag_index = tag_index
+        self.skipped = 0
+        self._lock = threading.Lock()
+
+    def includes(self, name, tags=None, arn=None, key=None, fallback_env=None):
+        tags_known = tags is not None
+        if not tags_known:
+            key = key or (arn_key(arn) if arn else None)
+            if self.tag_index is not None and key and key[0] not in _UNINDEXED_TAG_SERVICES:
+                tags, tags_known = self.tag_index.get(key, []), True
+        env = ENV_DETECTOR.details(name, tags)['environment']
+        if env == DEFAULT_ENV and fallback_env in self.environments:
+            return True
+        if env in self.environments or (env == DEFAULT_ENV and not tags_known):
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+
+_CURRENT_SCOPE = contextvars.ContextVar('env_scope', default=None)
+
+
+def start_env_scope(environments=None, tag_index=None):
+    """Sets (or, with no environments, clears) the scope for this invocation."""
+    scope = EnvScope(environments, tag_index) if environments else None
+    _CURRENT_SCOPE.set(scope)
+    return scope
+
+
+def in_env_scope(name, tags=None, arn=None, key=None, fallback_env=None):
+    """True if the resource belongs to a requested environment - always True
+    when the run is not scoped. Pass whichever cheap identifiers the
+    collector already has: inline tags, an ARN, or a (service, id) key.
+    fallback_env is the environment a resource whose name and tags match
+    none is filed under instead (e.g. an EventBridge rule takes its bus's)."""
+    scope = _CURRENT_SCOPE.get()
+    return scope is None or scope.includes(name, tags, arn, key, fallback_env)
+
+
+def indexed_tags(arn):
+    """A resource's tags from this run's tagging-API index ([] when it has
+    no entry, i.e. untagged), or None when there is no index or it does not
+    cover the service - the caller then fetches the tags itself."""
+    scope = _CURRENT_SCOPE.get()
+    key = arn_key(arn) if arn else None
+    if scope is None or scope.tag_index is None or key is None or key[0] in _UNINDEXED_TAG_SERVICES:
+        return None
+    return scope.tag_index.get(key, [])